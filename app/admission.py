@@ -0,0 +1,86 @@
+from fastapi.responses import JSONResponse
+
+import asyncio
+import logging
+
+from config import \
+    ADMISSION_GPT, \
+    ADMISSION_HEAVY, \
+    ADMISSION_DEFAULT, \
+    ADMISSION_QUEUE_TIMEOUT, \
+    RETRY_AFTER_SECONDS, \
+    DB_POOL_SIZE, \
+    DB_MAX_OVERFLOW
+
+OVERLOADED_STATUS = 503
+
+GPT_ROUTES = {('PUT', '/api/response'), ('PUT', '/api/filledResponse')}
+# connections outside admitted handlers: a claim heartbeat per GPT call and the periodic maintenance jobs
+RESERVED_CONNECTIONS = ADMISSION_GPT[0] + 3
+
+logger = logging.getLogger(__name__)
+
+HEAVY_ROUTES = {('GET', '/api/history'),
+                ('GET', '/api/archivedHistory'),
+                ('PUT', '/api/archiveHistory'),
+                ('PUT', '/api/similarAnswers/rebuild')}
+
+
+class AdmissionGate:
+    """At most limit requests run at once and at most queue wait for a slot, anything beyond is rejected at once"""
+    def __init__(self, limit: int, queue: int):
+        self.queue = queue
+        self.waiting = 0
+        self.slots = asyncio.Semaphore(limit)
+
+    async def acquire(self) -> bool:
+        if self.slots.locked() and self.waiting >= self.queue:
+            return False
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self.slots.acquire(), ADMISSION_QUEUE_TIMEOUT)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self.waiting -= 1
+
+    def release(self):
+        self.slots.release()
+
+
+gates = {'gpt': AdmissionGate(*ADMISSION_GPT),
+         'heavy': AdmissionGate(*ADMISSION_HEAVY),
+         'default': AdmissionGate(*ADMISSION_DEFAULT)}
+
+
+# an admitted request that then waits for a database connection is the overload this module is meant to reject
+admitted = ADMISSION_GPT[0] + ADMISSION_HEAVY[0] + ADMISSION_DEFAULT[0] + RESERVED_CONNECTIONS
+if admitted > DB_POOL_SIZE + DB_MAX_OVERFLOW:
+    logger.warning('Admission limits allow %s concurrent connections, the database pool only has %s',
+                   admitted, DB_POOL_SIZE + DB_MAX_OVERFLOW)
+
+
+def route_class(method: str, path: str) -> str:
+    if (method, path) in GPT_ROUTES:
+        return 'gpt'
+    if (method, path) in HEAVY_ROUTES:
+        return 'heavy'
+    return 'default'
+
+
+def overloaded_response(message: str) -> JSONResponse:
+    return JSONResponse(status_code=OVERLOADED_STATUS,
+                        content={'status': 'error', 'message': message},
+                        headers={'Retry-After': str(RETRY_AFTER_SECONDS)})
+
+
+async def admission_control(request, call_next):
+    """Separate gates per route class keep cheap endpoints responsive while GPT traffic is saturated"""
+    gate = gates[route_class(request.method, request.url.path.rstrip('/'))]
+    if not await gate.acquire():
+        return overloaded_response('Service is overloaded, retry later')
+    try:
+        return await call_next(request)
+    finally:
+        gate.release()
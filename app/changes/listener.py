@@ -0,0 +1,100 @@
+import psycopg2
+
+import asyncio
+import collections
+import json
+import logging
+
+from config import DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASS
+
+CHANNEL = 'gpt_writer_changes'
+QUEUE_SIZE = 100
+RECONNECT_DELAY = 5
+
+logger = logging.getLogger(__name__)
+
+
+class ChangeListener:
+    """One LISTEN connection per worker, read from the event loop and fanned out to per-workspace subscriber queues"""
+    def __init__(self):
+        self.subscribers: dict[str, set[asyncio.Queue]] = collections.defaultdict(set)
+        self.connection = None
+        self.fd = None
+        self.loop = None
+        # set once a connection was lost, the next successful LISTEN tells subscribers to refetch
+        self.reconnecting = False
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        try:
+            self.connection = psycopg2.connect(host=DB_HOST, port=DB_PORT, dbname=DB_NAME, user=DB_USER, password=DB_PASS)
+            self.connection.autocommit = True
+            self.connection.cursor().execute(f'LISTEN {CHANNEL}')
+        except psycopg2.Error:
+            logger.exception('Change listener failed to connect, retrying')
+            self.connection = None
+            loop.call_later(RECONNECT_DELAY, self.start, loop)
+            return
+        # a closed connection can't report its fileno anymore, so the fd is kept for remove_reader
+        self.fd = self.connection.fileno()
+        loop.add_reader(self.fd, self.read)
+        if self.reconnecting:
+            self.reconnecting = False
+            self.broadcast({'type': 'resync'})
+
+    def disconnect(self):
+        self.loop.remove_reader(self.fd)
+        self.fd = None
+        self.connection.close()
+        self.connection = None
+
+    def stop(self):
+        if self.connection is not None:
+            self.disconnect()
+
+    def read(self):
+        try:
+            self.connection.poll()
+        except psycopg2.Error:
+            logger.exception('Change listener lost its connection, reconnecting')
+            self.disconnect()
+            self.reconnecting = True
+            self.loop.call_later(RECONNECT_DELAY, self.start, self.loop)
+            return
+        while self.connection.notifies:
+            self.dispatch(json.loads(self.connection.notifies.pop(0).payload))
+
+    def dispatch(self, event: dict):
+        if event['table'] == 'workspace':
+            queues = set().union(*self.subscribers.values())
+        else:
+            queues = self.subscribers.get(event['workspace_id'], ())
+        for queue in queues:
+            self.publish(queue, {'type': 'change', **event})
+
+    def broadcast(self, event: dict):
+        for queue in set().union(*self.subscribers.values()):
+            self.publish(queue, event)
+
+    @staticmethod
+    def publish(queue: asyncio.Queue, event: dict):
+        """A subscriber that falls behind gets its backlog replaced by a single resync event"""
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait({'type': 'resync'})
+
+    def subscribe(self, workspace_id: str) -> asyncio.Queue:
+        queue = asyncio.Queue(QUEUE_SIZE)
+        self.subscribers[workspace_id].add(queue)
+        return queue
+
+    def unsubscribe(self, workspace_id: str, queue: asyncio.Queue):
+        self.subscribers[workspace_id].discard(queue)
+        if not self.subscribers[workspace_id]:
+            del self.subscribers[workspace_id]
+
+
+listener = ChangeListener()
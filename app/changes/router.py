@@ -0,0 +1,36 @@
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+
+import asyncio
+import uuid
+
+from workspace.models import Workspace
+from changes.listener import listener
+from init import read_session
+
+router = APIRouter(prefix='/api/changes',
+                   tags=['Changes'])
+
+def initial_workspace_id() -> uuid.UUID:
+    with read_session().begin() as session:
+        return session.query(Workspace.id).filter(Workspace.initial).first()[0]
+
+@router.websocket('')
+async def subscribe_changes(websocket: WebSocket, workspace_id: uuid.UUID | None = None):
+    await websocket.accept()
+    workspace_id = str(workspace_id or await run_in_threadpool(initial_workspace_id))
+    queue = listener.subscribe(workspace_id)
+
+    async def forward():
+        while True:
+            await websocket.send_json(await queue.get())
+
+    sender = asyncio.create_task(forward())
+    try:
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        listener.unsubscribe(workspace_id, queue)
@@ -1,5 +1,6 @@
 from dotenv import load_dotenv
 
+import json
 import os
 
 load_dotenv()
@@ -15,3 +16,70 @@ OPENAI_API_KEY = os.environ['OPENAI_API_KEY']
 ORIGINS = os.environ['ORIGINS'].split(' ')
 
 sqlalchemy_url = f'postgresql://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}?client_encoding=utf8'
+
+# per engine and worker, must cover the admission limits below plus GPT claim heartbeats and maintenance jobs
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 20))
+DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 20))
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 5))
+
+ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', 90))
+ARCHIVE_BATCH_SIZE = int(os.environ.get('ARCHIVE_BATCH_SIZE', 1000))
+ARCHIVE_COMPRESSION_LEVEL = int(os.environ.get('ARCHIVE_COMPRESSION_LEVEL', 9))
+# seconds between scheduled archiving runs in every worker, 0 leaves archiving to PUT /api/archiveHistory
+ARCHIVE_INTERVAL = int(os.environ.get('ARCHIVE_INTERVAL', 24 * 3600))
+ARCHIVE_PAGE_SIZE = int(os.environ.get('ARCHIVE_PAGE_SIZE', 50))
+ARCHIVE_MAX_PAGE_SIZE = int(os.environ.get('ARCHIVE_MAX_PAGE_SIZE', 500))
+
+PARTITION_MONTHS_AHEAD = int(os.environ.get('PARTITION_MONTHS_AHEAD', 2))
+PARTITION_MAINTENANCE_INTERVAL = int(os.environ.get('PARTITION_MAINTENANCE_INTERVAL', 6 * 3600))
+# milliseconds a past partition drop waits for its table locks before it's left to the next maintenance
+PARTITION_DROP_LOCK_TIMEOUT = int(os.environ.get('PARTITION_DROP_LOCK_TIMEOUT', 2000))
+
+TEXT_CLEANUP_INTERVAL = int(os.environ.get('TEXT_CLEANUP_INTERVAL', 6 * 3600))
+TEXT_CLEANUP_BATCH_SIZE = int(os.environ.get('TEXT_CLEANUP_BATCH_SIZE', 1000))
+
+OPENAI_API_BASE = os.environ.get('OPENAI_API_BASE')
+
+# reject | truncate | chunk
+PROMPT_OVERFLOW_POLICY = os.environ.get('PROMPT_OVERFLOW_POLICY', 'reject')
+MAX_PROMPT_TOKENS = int(os.environ.get('MAX_PROMPT_TOKENS', 6000))
+CHUNK_CONCURRENCY = int(os.environ.get('CHUNK_CONCURRENCY', 4))
+
+# JSON list of {"name", "model", "api_base", "api_key"}, defaults to OpenAI gpt-4 with the key above
+LLM_PROVIDERS = json.loads(os.environ.get('LLM_PROVIDERS') or json.dumps([
+    {'name': 'openai', 'model': 'gpt-4', 'api_base': OPENAI_API_BASE, 'api_key': OPENAI_API_KEY}
+]))
+HEDGE_REQUESTS = os.environ.get('HEDGE_REQUESTS', 'false').lower() == 'true'
+HEDGE_DEFAULT_DELAY = float(os.environ.get('HEDGE_DEFAULT_DELAY', 10))
+
+LLM_POOL_CONNECTIONS = int(os.environ.get('LLM_POOL_CONNECTIONS', 10))
+LLM_POOL_SIZE = int(os.environ.get('LLM_POOL_SIZE', 40))
+LLM_CONNECT_TIMEOUT = float(os.environ.get('LLM_CONNECT_TIMEOUT', 5))
+LLM_READ_TIMEOUT = float(os.environ.get('LLM_READ_TIMEOUT', 600))
+
+COALESCE_WINDOW = float(os.environ.get('COALESCE_WINDOW', 5))
+# the leader refreshes its claim every heartbeat interval, a claim not refreshed within the timeout is taken over
+COALESCE_HEARTBEAT_INTERVAL = float(os.environ.get('COALESCE_HEARTBEAT_INTERVAL', 5))
+COALESCE_CLAIM_TIMEOUT = float(os.environ.get('COALESCE_CLAIM_TIMEOUT', 3 * COALESCE_HEARTBEAT_INTERVAL))
+COALESCE_POLL_INTERVAL = float(os.environ.get('COALESCE_POLL_INTERVAL', 0.2))
+
+READ_REPLICA_URLS = os.environ.get('READ_REPLICA_URLS', '').split()
+READ_YOUR_WRITES_SECONDS = float(os.environ.get('READ_YOUR_WRITES_SECONDS', 5))
+
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+# requests sending this value in the X-Profile header are always profiled
+PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN')
+PROFILE_DIR = os.environ.get('PROFILE_DIR', 'profiles')
+PROFILING_ENABLED = PROFILE_SAMPLE_RATE > 0 or bool(PROFILE_TOKEN)
+
+# "<limit> <queue depth>" per route class: GPT completions, full history reads, everything else
+ADMISSION_GPT = list(map(int, os.environ.get('ADMISSION_GPT', '8 16').split()))
+ADMISSION_HEAVY = list(map(int, os.environ.get('ADMISSION_HEAVY', '4 8').split()))
+ADMISSION_DEFAULT = list(map(int, os.environ.get('ADMISSION_DEFAULT', '16 48').split()))
+ADMISSION_QUEUE_TIMEOUT = float(os.environ.get('ADMISSION_QUEUE_TIMEOUT', 5))
+RETRY_AFTER_SECONDS = int(os.environ.get('RETRY_AFTER_SECONDS', 5))
+
+# dotted path to a callable mapping a list of texts to an (n, EMBEDDING_DIM) float32 array
+EMBEDDING_FUNCTION = os.environ.get('EMBEDDING_FUNCTION', 'similar.embedding.hashing_embedding')
+EMBEDDING_DIM = int(os.environ.get('EMBEDDING_DIM', 512))
+EMBEDDING_DIR = os.environ.get('EMBEDDING_DIR', 'embeddings')
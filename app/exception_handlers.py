@@ -1,8 +1,15 @@
 from fastapi.exceptions import HTTPException
 from fastapi.responses import JSONResponse
 
+import logging
+
+from admission import overloaded_response
+
 REQUEST_VALIDATION_ERROR_STATUS = 422
 ENTITY_ERROR_STATUS = 400
+UPSTREAM_ERROR_STATUS = 502
+
+logger = logging.getLogger(__name__)
 
 
 def validation_handler(request, exc):
@@ -20,3 +27,17 @@ def unique_vailation_handler(request, exc):
 
 def entity_error_handler(request, exc):
     return JSONResponse(status_code=ENTITY_ERROR_STATUS, content={'status': 'error', 'message': str(exc)})
+
+
+def upstream_unavailable_handler(request, exc):
+    return overloaded_response('GPT service is unavailable, retry later')
+
+
+def database_overloaded_handler(request, exc):
+    return overloaded_response('Database is overloaded, retry later')
+
+
+def upstream_error_handler(request, exc):
+    # openai messages can contain credentials, e.g. a rejected API key, so they stay in the log
+    logger.error('GPT service error on %s %s: %s', request.method, request.url.path, exc)
+    return JSONResponse(status_code=UPSTREAM_ERROR_STATUS, content={'status': 'error', 'message': 'GPT service error'})
@@ -0,0 +1,114 @@
+from sqlalchemy import func, and_, text
+from sqlalchemy.orm import Session
+
+import datetime
+import json
+import uuid
+import zlib
+from zoneinfo import ZoneInfo
+
+from config import ARCHIVE_BATCH_SIZE, ARCHIVE_COMPRESSION_LEVEL, ARCHIVE_AFTER_DAYS
+from gpt_interactions.models import GptInteraction, FilledPrompt, ArchivedInteraction
+from gpt_interactions.schemas import InteractionSchema, GptRequestSchema
+from prompts.models import PromptText
+from prompts.texts import store_texts, delete_orphaned_texts
+from init import sqlalchemy_session
+
+# the same key in every worker, concurrent runs would select and archive the same interactions
+ARCHIVE_LOCK_KEY = 0x67706172
+
+
+def ordered_prompt(text_data: list[str], numbers: list[int]) -> list[str]:
+    return [text for text, _ in sorted(zip(text_data, numbers), key=lambda el: el[1])]
+
+
+def compress_interaction(interaction: GptInteraction, prompt: list[str]) -> bytes:
+    payload = {'username': interaction.username,
+               'company': interaction.company,
+               'favorite': interaction.favorite,
+               'gpt_answer': interaction.gpt_answer,
+               'model': interaction.model,
+               'prompt': prompt}
+    return zlib.compress(json.dumps(payload).encode(), ARCHIVE_COMPRESSION_LEVEL)
+
+
+def decompress_interaction(archived: ArchivedInteraction) -> InteractionSchema:
+    payload = json.loads(zlib.decompress(archived.data))
+    return InteractionSchema(id=archived.id,
+                             request=GptRequestSchema(prompt=payload['prompt'],
+                                                      username=payload['username'],
+                                                      company=payload['company'],
+                                                      model=payload.get('model')),
+                             datetime=archived.time_happened,
+                             favorite=payload['favorite'],
+                             gpt_response=payload['gpt_answer'])
+
+
+def archive_batch(session: Session, age: datetime.timedelta) -> int:
+    """Moves up to ARCHIVE_BATCH_SIZE non favorite interactions older than age to the archive table"""
+    threshold = datetime.datetime.now(ZoneInfo('Europe/Moscow')) - age
+    interactions = session.query(GptInteraction,
+                                 func.array_agg(PromptText.text_data),
+                                 func.array_agg(FilledPrompt.number),
+                                 func.array_agg(FilledPrompt.text_hash)) \
+        .filter(GptInteraction.time_happened < threshold,
+                FilledPrompt.time_happened < threshold,
+                ~GptInteraction.favorite) \
+        .join(FilledPrompt, and_(FilledPrompt.gpt_interaction_id == GptInteraction.id,
+                                 FilledPrompt.time_happened == GptInteraction.time_happened)) \
+        .join(PromptText, PromptText.hash == FilledPrompt.text_hash) \
+        .group_by(GptInteraction.id, GptInteraction.time_happened) \
+        .limit(ARCHIVE_BATCH_SIZE) \
+        .all()
+    if not interactions:
+        return 0
+    session.add_all(map(lambda el: ArchivedInteraction(id=el[0].id,
+                                                       time_happened=el[0].time_happened,
+                                                       workspace_id=el[0].workspace_id,
+                                                       data=compress_interaction(el[0], ordered_prompt(el[1], el[2]))),
+                        interactions))
+    session.flush()
+    session.query(GptInteraction) \
+        .filter(GptInteraction.id.in_([el[0].id for el in interactions])) \
+        .delete(synchronize_session=False)
+    # the archive keeps its own copy of the texts, ones only these interactions used leave the hot table
+    delete_orphaned_texts(session, list(set().union(*map(lambda el: el[3], interactions))))
+    return len(interactions)
+
+
+def archive_history(age: datetime.timedelta) -> int:
+    """Archives batch by batch, each in a transaction of its own, serialized across workers"""
+    archived, batch = 0, ARCHIVE_BATCH_SIZE
+    while batch == ARCHIVE_BATCH_SIZE:
+        with sqlalchemy_session.begin() as session:
+            session.execute(text('SELECT pg_advisory_xact_lock(:key)'), {'key': ARCHIVE_LOCK_KEY})
+            batch = archive_batch(session, age)
+        archived += batch
+    return archived
+
+
+def archive_expired_history():
+    """Scheduled every ARCHIVE_INTERVAL from main.py"""
+    archive_history(datetime.timedelta(days=ARCHIVE_AFTER_DAYS))
+
+
+def restore_interaction(session: Session, archived: ArchivedInteraction) -> GptInteraction:
+    payload = json.loads(zlib.decompress(archived.data))
+    interaction = GptInteraction(id=archived.id,
+                                 username=payload['username'],
+                                 company=payload['company'],
+                                 time_happened=archived.time_happened,
+                                 favorite=payload['favorite'],
+                                 gpt_answer=payload['gpt_answer'],
+                                 workspace_id=archived.workspace_id,
+                                 model=payload.get('model'))
+    session.add(interaction)
+    session.flush()
+    session.add_all(map(lambda i, h: FilledPrompt(id=uuid.UUID(hex=str(uuid.uuid4())),
+                                                  text_hash=h,
+                                                  gpt_interaction_id=archived.id,
+                                                  number=i,
+                                                  time_happened=archived.time_happened),
+                        *zip(*enumerate(store_texts(session, payload['prompt'])))))
+    session.delete(archived)
+    return interaction
@@ -0,0 +1,111 @@
+from sqlalchemy import func, or_, and_, delete, select, update
+from sqlalchemy.dialects.postgresql import insert
+
+import datetime
+import hashlib
+import logging
+import threading
+import time
+from concurrent.futures import Future
+
+from config import COALESCE_WINDOW, COALESCE_CLAIM_TIMEOUT, COALESCE_POLL_INTERVAL, COALESCE_HEARTBEAT_INTERVAL
+from gpt_interactions.models import CoalescedCompletion
+from gpt_interactions.completion import complete_prompt
+from gpt_interactions.providers import DEFAULT_MODEL
+from init import sqlalchemy_session
+
+_in_flight: dict[str, Future] = {}
+_in_flight_lock = threading.Lock()
+
+logger = logging.getLogger(__name__)
+
+
+def request_key(prompt: list[str], model: str | None) -> str:
+    return hashlib.sha256('\0'.join([model or DEFAULT_MODEL, *prompt]).encode()).hexdigest()
+
+
+def claim(key: str) -> bool:
+    """Claims the key for this worker unless another worker is computing it or finished it within the window"""
+    with sqlalchemy_session.begin() as session:
+        session.execute(delete(CoalescedCompletion).where(or_(
+            CoalescedCompletion.finished_at < func.now() - datetime.timedelta(seconds=COALESCE_WINDOW),
+            and_(CoalescedCompletion.finished_at.is_(None),
+                 CoalescedCompletion.created_at < func.now() - datetime.timedelta(seconds=COALESCE_CLAIM_TIMEOUT)))))
+        return session.execute(insert(CoalescedCompletion)
+                               .values(key=key, created_at=func.now())
+                               .on_conflict_do_nothing()
+                               .returning(CoalescedCompletion.key)).first() is not None
+
+
+def heartbeat(key: str, done: threading.Event):
+    """Keeps refreshing created_at of an unfinished claim, so followers take over within COALESCE_CLAIM_TIMEOUT
+    once the leader's worker dies instead of waiting for the whole GPT call timeout"""
+    while not done.wait(COALESCE_HEARTBEAT_INTERVAL):
+        try:
+            with sqlalchemy_session.begin() as session:
+                session.execute(update(CoalescedCompletion)
+                                .where(CoalescedCompletion.key == key, CoalescedCompletion.finished_at.is_(None))
+                                .values(created_at=func.now()))
+        except Exception:
+            logger.exception('Failed to refresh the claim of %s', key)
+
+
+def wait_for_answer(key: str) -> str | None:
+    """Polls a claim held by another worker, None means the claim was released or abandoned without an answer"""
+    while True:
+        with sqlalchemy_session.begin() as session:
+            row = session.execute(select(CoalescedCompletion.answer,
+                                         CoalescedCompletion.finished_at,
+                                         (CoalescedCompletion.created_at < func.now() - datetime.timedelta(
+                                             seconds=COALESCE_CLAIM_TIMEOUT)).label('stale'))
+                                  .where(CoalescedCompletion.key == key)).first()
+        if row is None or (row.finished_at is None and row.stale):
+            return None
+        if row.finished_at is not None:
+            return row.answer
+        time.sleep(COALESCE_POLL_INTERVAL)
+
+
+def complete_shared(key: str, prompt: list[str], model: str | None) -> str:
+    while not claim(key):
+        answer = wait_for_answer(key)
+        if answer is not None:
+            return answer
+    done = threading.Event()
+    threading.Thread(target=heartbeat, args=(key, done), daemon=True).start()
+    try:
+        answer = complete_prompt(prompt, model)
+    except Exception:
+        with sqlalchemy_session.begin() as session:
+            session.execute(delete(CoalescedCompletion).where(CoalescedCompletion.key == key))
+        raise
+    finally:
+        done.set()
+    with sqlalchemy_session.begin() as session:
+        session.execute(update(CoalescedCompletion)
+                        .where(CoalescedCompletion.key == key)
+                        .values(answer=answer, finished_at=func.now()))
+    return answer
+
+
+def coalesced_complete_prompt(prompt: list[str], model: str | None = None) -> str:
+    """Single flight for identical prompts: one caller per process joins the cross-worker claim,
+    concurrent identical callers in the same process wait on its future"""
+    key = request_key(prompt, model)
+    with _in_flight_lock:
+        future = _in_flight.get(key)
+        leader = future is None
+        if leader:
+            future = _in_flight[key] = Future()
+    if not leader:
+        return future.result()
+    try:
+        answer = complete_shared(key, prompt, model)
+        future.set_result(answer)
+        return answer
+    except Exception as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _in_flight_lock:
+            del _in_flight[key]
@@ -0,0 +1,26 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from config import CHUNK_CONCURRENCY
+from gpt_interactions.prompt_assembly import assemble_prompt
+from gpt_interactions.providers import complete, DEFAULT_MODEL
+
+MAP_INSTRUCTION = 'This is part {number} of {total} of a longer request. Answer it as far as this part allows.\n\n'
+REDUCE_INSTRUCTION = 'Combine the following partial answers to one request into a single coherent answer.'
+
+
+def check_prompt(prompt: list[str], model: str | None = None):
+    """Raises for prompts the overflow policy rejects, called before any claim or network call"""
+    assemble_prompt(prompt, model or DEFAULT_MODEL, chunk_instruction=MAP_INSTRUCTION)
+
+
+def complete_prompt(prompt: list[str], model: str | None = None) -> str:
+    """Checks the prompt size before any network call and map-reduces prompts split by the chunk policy"""
+    model = model or DEFAULT_MODEL
+    chunks = assemble_prompt(prompt, model, chunk_instruction=MAP_INSTRUCTION)
+    if len(chunks) == 1:
+        return complete(chunks[0], model)
+    with ThreadPoolExecutor(min(CHUNK_CONCURRENCY, len(chunks))) as executor:
+        partial_answers = list(executor.map(
+            lambda number, chunk: complete(MAP_INSTRUCTION.format(number=number, total=len(chunks)) + chunk, model),
+            range(1, len(chunks) + 1), chunks))
+    return complete_prompt([REDUCE_INSTRUCTION, *partial_answers], model)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, TIMESTAMP, ForeignKey, UUID, BOOLEAN, Integer
+from sqlalchemy import Column, String, TIMESTAMP, ForeignKey, UUID, BOOLEAN, Integer, LargeBinary
 from sqlalchemy.ext.declarative import declarative_base
 
 import datetime
@@ -8,6 +8,8 @@ from init import sql_engine
 
 Base = declarative_base()
 
+# gpt_interaction and filled_prompt are range partitioned by time_happened in the database,
+# so their real primary keys are (id, time_happened); id alone is still unique per row
 class GptInteraction(Base):
     def __init__(self,
                  id: uuid.UUID,
@@ -16,7 +18,8 @@ class GptInteraction(Base):
                  time_happened: datetime.datetime,
                  favorite: bool,
                  gpt_answer: str,
-                 workspace_id: uuid.UUID):
+                 workspace_id: uuid.UUID,
+                 model: str | None):
         self.id = id
         self.username = username
         self.company = company
@@ -24,6 +27,7 @@ class GptInteraction(Base):
         self.favorite = favorite
         self.gpt_answer = gpt_answer
         self.workspace_id = workspace_id
+        self.model = model
     __tablename__ = 'gpt_interaction'
     id = Column(UUID, primary_key=True)
     username = Column(String, nullable=False)
@@ -32,17 +36,49 @@ class GptInteraction(Base):
     favorite = Column(BOOLEAN, nullable=False, server_default='False')
     gpt_answer = Column(String, nullable=False)
     workspace_id = Column(ForeignKey('workspace.id', ondelete='cascade'), nullable=False)
+    # the model that answered, null for interactions stored before models were selectable
+    model = Column(String)
 
 class FilledPrompt(Base):
-    def __init__(self, id: uuid.UUID, text_data: str, gpt_interaction_id: uuid.UUID, number: int):
+    def __init__(self,
+                 id: uuid.UUID,
+                 text_hash: bytes,
+                 gpt_interaction_id: uuid.UUID,
+                 number: int,
+                 time_happened: datetime.datetime):
         self.id = id
-        self.text_data = text_data
+        self.text_hash = text_hash
         self.gpt_interaction_id = gpt_interaction_id
         self.number = number
+        self.time_happened = time_happened
     __tablename__ = 'filled_prompt'
     id = Column(UUID, primary_key=True)
-    text_data = Column(String, nullable=False)
+    text_hash = Column(LargeBinary, ForeignKey('prompt_text.hash'), nullable=False)
     gpt_interaction_id = Column(UUID, ForeignKey('gpt_interaction.id', ondelete='cascade'), nullable=False)
     number = Column(Integer, nullable=False)
+    # partition key, copied from the owning gpt_interaction
+    time_happened = Column(TIMESTAMP, nullable=False)
+
+class ArchivedInteraction(Base):
+    def __init__(self, id: uuid.UUID, time_happened: datetime.datetime, workspace_id: uuid.UUID, data: bytes):
+        self.id = id
+        self.time_happened = time_happened
+        self.workspace_id = workspace_id
+        self.data = data
+    __tablename__ = 'gpt_interaction_archive'
+    id = Column(UUID, primary_key=True)
+    time_happened = Column(TIMESTAMP, nullable=False)
+    workspace_id = Column(ForeignKey('workspace.id', ondelete='cascade'), nullable=False)
+    data = Column(LargeBinary, nullable=False)
+
+class CoalescedCompletion(Base):
+    def __init__(self, key: str, created_at: datetime.datetime):
+        self.key = key
+        self.created_at = created_at
+    __tablename__ = 'coalesced_completion'
+    key = Column(String(64), primary_key=True)
+    answer = Column(String)
+    created_at = Column(TIMESTAMP, nullable=False)
+    finished_at = Column(TIMESTAMP)
 
 Base.metadata.reflect(bind=sql_engine)
@@ -0,0 +1,90 @@
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+import datetime
+import logging
+from zoneinfo import ZoneInfo
+
+from config import PARTITION_MONTHS_AHEAD, PARTITION_DROP_LOCK_TIMEOUT
+from init import sqlalchemy_session
+
+# parents go first: filled_prompt partitions reference gpt_interaction partitions
+PARTITIONED_TABLES = ('gpt_interaction', 'filled_prompt')
+# the same key in every worker, CREATE TABLE IF NOT EXISTS alone isn't safe against concurrent creators
+PARTITION_LOCK_KEY = 0x67707470
+
+logger = logging.getLogger(__name__)
+
+
+def month_start(moment: datetime.datetime) -> datetime.date:
+    return datetime.date(moment.year, moment.month, 1)
+
+
+def add_months(month: datetime.date, months: int) -> datetime.date:
+    year, month_index = divmod(month.year * 12 + month.month - 1 + months, 12)
+    return datetime.date(year, month_index + 1, 1)
+
+
+def partition_name(table: str, month: datetime.date) -> str:
+    return f'{table}_p{month:%Y_%m}'
+
+
+def lock_partitions(session: Session):
+    session.execute(text('SELECT pg_advisory_xact_lock(:key)'), {'key': PARTITION_LOCK_KEY})
+
+
+def create_partitions(session: Session, month: datetime.date, months_ahead: int = 0):
+    for start in map(lambda offset: add_months(month, offset), range(months_ahead + 1)):
+        for table in PARTITIONED_TABLES:
+            session.execute(text(f"CREATE TABLE IF NOT EXISTS {partition_name(table, start)} PARTITION OF {table} "
+                                 f"FOR VALUES FROM ('{start}') TO ('{add_months(start, 1)}')"))
+
+
+def past_partitions(before: datetime.date) -> list[datetime.date]:
+    with sqlalchemy_session.begin() as session:
+        partitions = session.execute(text('SELECT child.relname FROM pg_inherits '
+                                          'JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+                                          'JOIN pg_class parent ON parent.oid = pg_inherits.inhparent '
+                                          'WHERE parent.relname = :table'),
+                                     {'table': PARTITIONED_TABLES[0]}).scalars().all()
+    months = map(lambda partition: datetime.datetime.strptime(partition[-7:], '%Y_%m').date(), partitions)
+    return sorted(filter(lambda month: month < before, months))
+
+
+def drop_partition_if_empty(month: datetime.date) -> bool:
+    """Detaches and drops one month left empty by archiving, referencing filled_prompt first.
+    DETACH locks the parent exclusively, so a drop that can't get its locks within the timeout
+    is left to the next run instead of queueing every insert behind it."""
+    with sqlalchemy_session.begin() as session:
+        lock_partitions(session)
+        session.execute(text(f"SET LOCAL lock_timeout = '{PARTITION_DROP_LOCK_TIMEOUT}ms'"))
+        # no restore can insert into the month between the check and the detach
+        session.execute(text(f'LOCK TABLE {", ".join(map(lambda t: partition_name(t, month), PARTITIONED_TABLES))} '
+                             f'IN ACCESS EXCLUSIVE MODE'))
+        if session.execute(text(f'SELECT EXISTS (SELECT 1 FROM {partition_name(PARTITIONED_TABLES[0], month)})')).scalar():
+            return False
+        for table in reversed(PARTITIONED_TABLES):
+            session.execute(text(f'ALTER TABLE {table} DETACH PARTITION {partition_name(table, month)}'))
+            session.execute(text(f'DROP TABLE {partition_name(table, month)}'))
+    return True
+
+
+def ensure_partitions(month: datetime.date, months_ahead: int = 0):
+    """Creates missing partitions in a transaction of its own, never inside a transaction that writes rows,
+    since the DDL locks the whole parent table until commit"""
+    with sqlalchemy_session.begin() as session:
+        lock_partitions(session)
+        create_partitions(session, month, months_ahead)
+
+
+def maintain_partitions():
+    """Run at startup and every PARTITION_MAINTENANCE_INTERVAL, so inserts always find their month's partition.
+    Creation commits first, a failing drop of one past month can't roll it back or stop the other drops."""
+    current_month = month_start(datetime.datetime.now(ZoneInfo('Europe/Moscow')))
+    ensure_partitions(current_month, PARTITION_MONTHS_AHEAD)
+    for month in past_partitions(current_month):
+        try:
+            drop_partition_if_empty(month)
+        except DBAPIError:
+            logger.exception('Failed to drop the partitions of %s, retrying at the next maintenance', month)
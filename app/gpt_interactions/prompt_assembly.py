@@ -0,0 +1,84 @@
+import functools
+
+from config import PROMPT_OVERFLOW_POLICY, MAX_PROMPT_TOKENS
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+CHARS_PER_TOKEN = 4
+
+
+class ApproximateEncoding:
+    """Fallback used when tiktoken or its BPE files are unavailable, about 4 characters per token"""
+    def encode(self, text: str) -> list[str]:
+        return [text[i:i + CHARS_PER_TOKEN] for i in range(0, len(text), CHARS_PER_TOKEN)]
+
+    def decode(self, tokens: list[str]) -> str:
+        return ''.join(tokens)
+
+
+@functools.lru_cache
+def get_encoding(model: str):
+    if tiktoken is None:
+        return ApproximateEncoding()
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        pass
+    except Exception:
+        return ApproximateEncoding()
+    # models tiktoken doesn't know, e.g. local ones, and the BPE file may be missing too
+    try:
+        return tiktoken.get_encoding('cl100k_base')
+    except Exception:
+        return ApproximateEncoding()
+
+
+def count_tokens(text: str, model: str) -> int:
+    return len(get_encoding(model).encode(text))
+
+
+def split_fragment(fragment: str, model: str, max_tokens: int) -> list[str]:
+    encoding = get_encoding(model)
+    tokens = encoding.encode(fragment)
+    return [encoding.decode(tokens[i:i + max_tokens]) for i in range(0, len(tokens), max_tokens)]
+
+
+def chunk_prompt(prompt: list[str], model: str, max_tokens: int) -> list[str]:
+    """Packs prompt fragments greedily into chunks of at most max_tokens, splitting fragments that don't fit alone"""
+    chunks, current, current_tokens = [], [], 0
+    for fragment in prompt:
+        for piece in split_fragment(fragment, model, max_tokens) or ['']:
+            piece_tokens = count_tokens(piece + '\n', model)
+            if current and current_tokens + piece_tokens > max_tokens:
+                chunks.append('\n'.join(current))
+                current, current_tokens = [], 0
+            current.append(piece)
+            current_tokens += piece_tokens
+    if current:
+        chunks.append('\n'.join(current))
+    return chunks
+
+
+def assemble_prompt(prompt: list[str],
+                    model: str,
+                    policy: str = PROMPT_OVERFLOW_POLICY,
+                    max_tokens: int = MAX_PROMPT_TOKENS,
+                    chunk_instruction: str = '') -> list[str]:
+    """Returns the prompt contents to send, more than one only when the chunk policy splits an oversized prompt.
+    chunk_instruction is the template later prepended to every chunk, its tokens are kept free in each chunk"""
+    content = '\n'.join(prompt)
+    tokens = count_tokens(content, model)
+    if tokens <= max_tokens:
+        return [content]
+    if policy == 'truncate':
+        return [split_fragment(content, model, max_tokens)[0]]
+    if policy == 'chunk':
+        # there can't be more chunks than tokens, so this bounds the formatted part numbers
+        instruction_tokens = count_tokens(chunk_instruction.format(number=tokens, total=tokens), model)
+        if instruction_tokens >= max_tokens:
+            raise AttributeError(f'Chunk instruction alone is {instruction_tokens} tokens long, the limit is {max_tokens}')
+        return chunk_prompt(prompt, model, max_tokens - instruction_tokens)
+    raise AttributeError(f'Prompt is {tokens} tokens long, the limit is {max_tokens}')
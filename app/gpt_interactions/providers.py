@@ -0,0 +1,116 @@
+import openai
+
+import collections
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from config import LLM_PROVIDERS, HEDGE_REQUESTS, HEDGE_DEFAULT_DELAY, ADMISSION_GPT, CHUNK_CONCURRENCY
+from http_pool import LLM_TIMEOUT
+
+LATENCY_WINDOW = 200
+MIN_SAMPLES = 20
+# samples older than this are ignored, so penalties of a recovered backend expire
+LATENCY_MAX_AGE = 300
+# share of calls sent to a provider other than the fastest, keeping every provider's samples fresh
+PROBE_RATIO = 0.05
+# recorded as the latency of a call the backend failed so routing moves away from it,
+# errors caused by the request itself, e.g. invalid or too long prompts, say nothing about the backend
+FAILURE_PENALTY = 60.0
+
+
+class Provider:
+    def __init__(self, name: str, model: str, api_base: str | None = None, api_key: str | None = None):
+        self.name = name
+        self.model = model
+        self.api_base = api_base
+        self.api_key = api_key
+        self.latencies = collections.deque(maxlen=LATENCY_WINDOW)
+
+    def complete(self, content: str) -> str:
+        started = time.perf_counter()
+        try:
+            response = openai.ChatCompletion.create(model=self.model,
+                                                    messages=[{'role': 'user', 'content': content}],
+                                                    api_key=self.api_key,
+                                                    api_base=self.api_base,
+                                                    request_timeout=LLM_TIMEOUT)
+        except openai.error.OpenAIError as e:
+            if backend_failure(e):
+                self.latencies.append((time.monotonic(), FAILURE_PENALTY))
+            raise
+        self.latencies.append((time.monotonic(), time.perf_counter() - started))
+        return response['choices'][0]['message']['content']
+
+    def percentile(self, share: float, min_samples: int = MIN_SAMPLES) -> float | None:
+        threshold = time.monotonic() - LATENCY_MAX_AGE
+        # list() copies the deque atomically while other threads append to it
+        ordered = sorted(latency for recorded, latency in list(self.latencies) if recorded > threshold)
+        if len(ordered) < max(min_samples, 1):
+            return None
+        return ordered[min(len(ordered) - 1, int(share * len(ordered)))]
+
+
+def backend_failure(e: openai.error.OpenAIError) -> bool:
+    return isinstance(e, (openai.error.Timeout, openai.error.APIConnectionError)) or (e.http_status or 0) >= 500
+
+
+providers = list(map(lambda p: Provider(**p), LLM_PROVIDERS))
+DEFAULT_MODEL = providers[0].model
+
+# every admitted GPT request can run CHUNK_CONCURRENCY calls at once, each a primary and a hedge,
+# so calls never queue for a thread
+hedge_executor = ThreadPoolExecutor(ADMISSION_GPT[0] * CHUNK_CONCURRENCY * 2, thread_name_prefix='llm-hedge')
+
+
+def providers_for(model: str | None) -> list[Provider]:
+    """Providers serving the model, fastest recent median first; ones without recent samples are tried first
+    to measure them, and now and then a random other provider goes first so no statistics go stale"""
+    candidates = list(filter(lambda p: p.model == (model or DEFAULT_MODEL), providers))
+    if not candidates: raise AttributeError(f"model {model} isn't configured")
+    candidates.sort(key=lambda p: p.percentile(0.5, min_samples=1) or 0.0)
+    if len(candidates) > 1 and random.random() < PROBE_RATIO:
+        candidates.insert(0, candidates.pop(random.randrange(1, len(candidates))))
+    return candidates
+
+
+def hedged_complete(primary: Provider, secondary: Provider, content: str) -> str:
+    """Sends a duplicate request to the secondary once the primary exceeds its p95 and takes whichever answers first.
+    The slower call can't be cancelled and finishes in the background."""
+    started = threading.Event()
+
+    def run_primary() -> str:
+        started.set()
+        return primary.complete(content)
+
+    futures = [hedge_executor.submit(run_primary)]
+    # the p95 timer starts when the primary runs, time spent waiting for a thread doesn't count
+    started.wait()
+    done, _ = wait(futures, timeout=primary.percentile(0.95) or HEDGE_DEFAULT_DELAY)
+    if not done or futures[0].exception() is not None:
+        futures.append(hedge_executor.submit(secondary.complete, content))
+    pending = set(futures)
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                return future.result()
+    return futures[-1].result()
+
+
+def complete(content: str, model: str | None = None) -> str:
+    """Fails over to the next provider when a backend fails, errors caused by the request are raised right away"""
+    candidates = providers_for(model)
+    if HEDGE_REQUESTS and len(candidates) > 1:
+        attempts = [lambda: hedged_complete(candidates[0], candidates[1], content)] + \
+            list(map(lambda p: lambda: p.complete(content), candidates[2:]))
+    else:
+        attempts = list(map(lambda p: lambda: p.complete(content), candidates))
+    for attempt in attempts[:-1]:
+        try:
+            return attempt()
+        except openai.error.OpenAIError as e:
+            if not backend_failure(e):
+                raise
+    return attempts[-1]()
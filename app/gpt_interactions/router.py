@@ -1,74 +1,198 @@
-from fastapi import APIRouter
-from sqlalchemy import func, desc
-import openai
+from fastapi import APIRouter, Query
+from sqlalchemy import func, desc, and_, update
+from sqlalchemy.orm import Session
 
 import uuid
 import datetime
 from zoneinfo import ZoneInfo
 
 from workspace.models import Workspace
-from gpt_interactions.models import GptInteraction, FilledPrompt
-from gpt_interactions.schemas import InteractionsResponse, InteractionSchema, GptRequestSchema, GptAnswerResponse
-from init import sqlalchemy_session
+from prompts.models import PromptBlank, PromptText
+from prompts.texts import store_texts
+from questions.models import Match
+from prompts.filling import fill_prompt
+from gpt_interactions.models import GptInteraction, FilledPrompt, ArchivedInteraction
+from gpt_interactions.schemas import \
+    InteractionsResponse, \
+    InteractionSchema, \
+    GptRequestSchema, \
+    GptAnswerResponse, \
+    ArchiveResponse, \
+    ArchiveSchema, \
+    FillRequestSchema, \
+    FilledAnswerSchema, \
+    FilledAnswerResponse, \
+    ConnectionPoolSchema, \
+    ConnectionPoolsResponse
+from gpt_interactions.archive import archive_history, decompress_interaction, restore_interaction
+from gpt_interactions.partitions import ensure_partitions, month_start
+from gpt_interactions.coalescing import coalesced_complete_prompt
+from gpt_interactions.completion import check_prompt
+from gpt_interactions.providers import DEFAULT_MODEL
+from profiling import ProfiledRoute
+from similar.index import index_interaction
+from init import sqlalchemy_session, read_session
+from http_pool import connection_stats
+from config import ARCHIVE_AFTER_DAYS, ARCHIVE_PAGE_SIZE, ARCHIVE_MAX_PAGE_SIZE
 
 router = APIRouter(prefix='/api',
+                   route_class=ProfiledRoute,
                    tags=['GPT Interactions'])
 
-def get_interactions(message: str) -> InteractionsResponse:
+def interaction_list(session: Session,
+                     date_from: datetime.datetime | None = None,
+                     date_to: datetime.datetime | None = None,
+                     ids: list[uuid.UUID] | None = None) -> list[InteractionSchema]:
+    history = session.query(GptInteraction,
+                            func.array_agg(PromptText.text_data),
+                            func.array_agg(FilledPrompt.number)) \
+        .filter(GptInteraction.workspace_id == session.query(Workspace.id).filter(Workspace.initial).first()[0]) \
+        .join(FilledPrompt, and_(FilledPrompt.gpt_interaction_id == GptInteraction.id,
+                                 FilledPrompt.time_happened == GptInteraction.time_happened)) \
+        .join(PromptText, PromptText.hash == FilledPrompt.text_hash)
+    # bounds are repeated for both tables so the planner prunes partitions of each
+    if date_from is not None:
+        history = history.filter(GptInteraction.time_happened >= date_from, FilledPrompt.time_happened >= date_from)
+    if date_to is not None:
+        history = history.filter(GptInteraction.time_happened < date_to, FilledPrompt.time_happened < date_to)
+    if ids is not None:
+        history = history.filter(GptInteraction.id.in_(ids))
+    history = history.group_by(GptInteraction.id, GptInteraction.time_happened)\
+        .order_by(desc(GptInteraction.time_happened))\
+        .all()
+    return list(map(lambda el: InteractionSchema(
+        id=el[0].id,
+        request=GptRequestSchema(
+            prompt=list(zip(*sorted(zip(el[1],el[2]), key=lambda el: el[1])))[0],
+            username=el[0].username,
+            company=el[0].company,
+            model=el[0].model,
+        ),
+        datetime=el[0].time_happened,
+        favorite=el[0].favorite,
+        gpt_response=el[0].gpt_answer), history))
+
+def get_interactions(message: str,
+                     date_from: datetime.datetime | None = None,
+                     date_to: datetime.datetime | None = None) -> InteractionsResponse:
+    with read_session().begin() as session:
+        history = interaction_list(session, date_from, date_to)
+    return InteractionsResponse(status='success', message=message, data=history)
+
+def set_favorite(id: uuid.UUID, favorite: bool, message: str) -> InteractionsResponse:
     with sqlalchemy_session.begin() as session:
-        history = session.query(GptInteraction,
-                                func.array_agg(FilledPrompt.text_data),
-                                func.array_agg(FilledPrompt.number)) \
-            .filter(GptInteraction.workspace_id == session.query(Workspace.id).filter(Workspace.initial).first()[0]) \
-            .join(FilledPrompt).group_by(GptInteraction.id)\
-            .order_by(desc(GptInteraction.time_happened))\
-            .all()
-        history = list(map(lambda el: InteractionSchema(
-            id=el[0].id,
-            request=GptRequestSchema(
-                prompt=list(zip(*sorted(zip(el[1],el[2]), key=lambda el: el[1])))[0],
-                username=el[0].username,
-                company=el[0].company,
-            ),
-            datetime=el[0].time_happened,
-            favorite=el[0].favorite,
-            gpt_response=el[0].gpt_answer), history))
+        updated = session.execute(update(GptInteraction)
+                                  .where(GptInteraction.id == id)
+                                  .values(favorite=favorite)
+                                  .returning(GptInteraction.id)).first()
+        if updated is None: raise AttributeError("Id doesn't exist")
+        history = interaction_list(session)
     return InteractionsResponse(status='success', message=message, data=history)
 
 
-@router.put('/response')
-def get_response(request: GptRequestSchema) -> GptAnswerResponse:
-    response = openai.ChatCompletion.create(model='gpt-4', messages=[{'role': 'user', 'content': '\n'.join(request.prompt)}])
-    answer = response['choices'][0]['message']['content']
+def store_interaction(request: GptRequestSchema, answer: str, workspace_id: uuid.UUID | None = None):
     interaction_id = uuid.UUID(hex=str(uuid.uuid4()))
+    time_happened = datetime.datetime.now(ZoneInfo('Europe/Moscow'))
     with sqlalchemy_session.begin() as session:
+        workspace_id = workspace_id or session.query(Workspace.id).filter(Workspace.initial).first()[0]
         session.add(GptInteraction(id=interaction_id,
                                    gpt_answer=answer,
                                    username=request.username,
                                    favorite=False,
                                    company=request.company,
-                                   time_happened=datetime.datetime.now(ZoneInfo('Europe/Moscow')),
-                                   workspace_id=session.query(Workspace.id).filter(Workspace.initial).first()[0]))
+                                   time_happened=time_happened,
+                                   workspace_id=workspace_id,
+                                   model=request.model or DEFAULT_MODEL))
         session.flush()
-        session.add_all(map(lambda i, pr: FilledPrompt(id=uuid.UUID(hex=str(uuid.uuid4())),
-                                                    text_data=pr,
-                                                    gpt_interaction_id=interaction_id,
-                                                    number=i),
-                            *zip(*enumerate(request.prompt))))
+        session.add_all(map(lambda i, h: FilledPrompt(id=uuid.UUID(hex=str(uuid.uuid4())),
+                                                   text_hash=h,
+                                                   gpt_interaction_id=interaction_id,
+                                                   number=i,
+                                                   time_happened=time_happened),
+                            *zip(*enumerate(store_texts(session, request.prompt)))))
+    index_interaction(workspace_id, interaction_id, request.prompt)
+
+@router.put('/response')
+def get_response(request: GptRequestSchema) -> GptAnswerResponse:
+    check_prompt(request.prompt, request.model)
+    answer = coalesced_complete_prompt(request.prompt, request.model)
+    store_interaction(request, answer)
     return GptAnswerResponse(status='success', message='GPT Response successfully retrieved', data={'gpt_response': answer})
 
+@router.put('/filledResponse')
+def get_filled_response(request: FillRequestSchema) -> FilledAnswerResponse:
+    with sqlalchemy_session.begin() as session:
+        workspace = session.get(Workspace, request.workspace_id) if request.workspace_id \
+            else session.query(Workspace).filter(Workspace.initial).first()
+        if workspace is None: raise AttributeError("workspace doesn't exist")
+        workspace_id = workspace.id
+        blanks = list(map(lambda p: p.text_data,
+                          session.query(PromptBlank).filter(PromptBlank.workspace_id == workspace_id).all()))
+        answers = dict(session.query(Match.question, Match.answer).filter(Match.workspace_id == workspace_id).all())
+    prompt = fill_prompt(blanks, {**answers, **request.overrides})
+    filled_request = GptRequestSchema(prompt=prompt, username=request.username, company=request.company, model=request.model)
+    check_prompt(filled_request.prompt, filled_request.model)
+    answer = coalesced_complete_prompt(filled_request.prompt, filled_request.model)
+    store_interaction(filled_request, answer, workspace_id)
+    return FilledAnswerResponse(status='success',
+                                message='GPT Response successfully retrieved',
+                                data=FilledAnswerSchema(gpt_response=answer, prompt=prompt))
+
 @router.get('/history')
-def get_history() -> InteractionsResponse:
-    return get_interactions('History successfully retrieved')
+def get_history(date_from: datetime.datetime | None = None, date_to: datetime.datetime | None = None) -> InteractionsResponse:
+    return get_interactions('History successfully retrieved', date_from, date_to)
 
 @router.put('/favoriteHistory')
 def add_to_favorite(id: uuid.UUID)->InteractionsResponse:
-    with sqlalchemy_session.begin() as session:
-        session.get(GptInteraction, id).favorite = True
-    return get_interactions('Interaction successfully added to favorite')
+    return set_favorite(id, True, 'Interaction successfully added to favorite')
 
 @router.delete('/favoriteHistory')
 def delete_from_favorite(id: uuid.UUID)->InteractionsResponse:
+    return set_favorite(id, False, 'Interaction successfully deleted from favorite')
+
+@router.put('/archiveHistory')
+def archive_old_history(days: int = Query(ARCHIVE_AFTER_DAYS, ge=1)) -> ArchiveResponse:
+    archived = archive_history(datetime.timedelta(days=days))
+    return ArchiveResponse(status='success', message='History successfully archived', data=ArchiveSchema(archived=archived))
+
+# one interaction by id or a page, newest first; the next page is requested with date_to of the oldest one returned
+@router.get('/archivedHistory')
+def get_archived_history(id: uuid.UUID | None = None,
+                         date_from: datetime.datetime | None = None,
+                         date_to: datetime.datetime | None = None,
+                         limit: int = Query(ARCHIVE_PAGE_SIZE, gt=0, le=ARCHIVE_MAX_PAGE_SIZE)) -> InteractionsResponse:
+    with read_session().begin() as session:
+        history = session.query(ArchivedInteraction) \
+            .filter(ArchivedInteraction.workspace_id == session.query(Workspace.id).filter(Workspace.initial).first()[0])
+        if id is not None:
+            history = history.filter(ArchivedInteraction.id == id)
+        if date_from is not None:
+            history = history.filter(ArchivedInteraction.time_happened >= date_from)
+        if date_to is not None:
+            history = history.filter(ArchivedInteraction.time_happened < date_to)
+        history = history.order_by(desc(ArchivedInteraction.time_happened)) \
+            .limit(limit) \
+            .all()
+        history = list(map(decompress_interaction, history))
+    return InteractionsResponse(status='success', message='Archived history successfully retrieved', data=history)
+
+@router.delete('/archivedHistory')
+def restore_from_archive(id: uuid.UUID) -> InteractionsResponse:
+    with sqlalchemy_session.begin() as session:
+        time_happened = session.query(ArchivedInteraction.time_happened).filter(ArchivedInteraction.id == id).scalar()
+    if time_happened is None: raise AttributeError("Id doesn't exist")
+    # the month's partition may have been dropped once archiving emptied it
+    ensure_partitions(month_start(time_happened))
     with sqlalchemy_session.begin() as session:
-        session.get(GptInteraction, id).favorite = False
-    return get_interactions('Interaction successfully deleted from favorite')
+        archived = session.get(ArchivedInteraction, id)
+        if archived is None: raise AttributeError("Id doesn't exist")
+        restore_interaction(session, archived)
+        session.flush()
+        history = interaction_list(session)
+    return InteractionsResponse(status='success', message='Interaction successfully restored from archive', data=history)
+
+@router.get('/llmConnections')
+def get_llm_connections() -> ConnectionPoolsResponse:
+    return ConnectionPoolsResponse(status='success',
+                                   message='LLM connection pools successfully retrieved',
+                                   data=list(map(lambda p: ConnectionPoolSchema(**p), connection_stats())))
@@ -9,6 +9,7 @@ class GptRequestSchema(BaseModel):
     prompt: list[str]
     username: str
     company: str
+    model: str | None = None
 
 class GptAnswerSchema(BaseModel):
     gpt_response: str
@@ -16,6 +17,19 @@ class GptAnswerSchema(BaseModel):
 class GptAnswerResponse(BaseResponse):
     data: GptAnswerSchema
 
+class FillRequestSchema(BaseModel):
+    workspace_id: uuid.UUID | None = None
+    overrides: dict[str, str] = {}
+    username: str
+    company: str
+    model: str | None = None
+
+class FilledAnswerSchema(GptAnswerSchema):
+    prompt: list[str]
+
+class FilledAnswerResponse(BaseResponse):
+    data: FilledAnswerSchema
+
 class InteractionSchema(BaseModel):
     id: uuid.UUID
     request: GptRequestSchema
@@ -25,3 +39,19 @@ class InteractionSchema(BaseModel):
 
 class InteractionsResponse(BaseResponse):
     data: list[InteractionSchema]
+
+class ArchiveSchema(BaseModel):
+    archived: int
+
+class ArchiveResponse(BaseResponse):
+    data: ArchiveSchema
+
+class ConnectionPoolSchema(BaseModel):
+    host: str
+    connections: int
+    requests: int
+    reuse_ratio: float
+    idle: int
+
+class ConnectionPoolsResponse(BaseResponse):
+    data: list[ConnectionPoolSchema]
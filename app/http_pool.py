@@ -0,0 +1,37 @@
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import LLM_POOL_CONNECTIONS, LLM_POOL_SIZE, LLM_CONNECT_TIMEOUT, LLM_READ_TIMEOUT
+
+LLM_TIMEOUT = (LLM_CONNECT_TIMEOUT, LLM_READ_TIMEOUT)
+
+
+class SharedSession(requests.Session):
+    """openai recycles each thread's session every few minutes by closing it, which would close the adapter
+    shared by all threads and drop every pooled connection, so closing is left to the process exit"""
+    def close(self):
+        pass
+
+
+# one keep-alive pool per process shared by every worker thread, instead of a session per thread
+llm_adapter = HTTPAdapter(pool_connections=LLM_POOL_CONNECTIONS, pool_maxsize=LLM_POOL_SIZE, max_retries=2)
+llm_session = SharedSession()
+llm_session.mount('https://', llm_adapter)
+llm_session.mount('http://', llm_adapter)
+
+
+def connection_stats() -> list[dict]:
+    """New connections opened vs requests sent per upstream host, a reuse ratio near 1 means keep-alive works"""
+    stats = []
+    pools = llm_adapter.poolmanager.pools
+    for key in pools.keys():
+        try:
+            pool = pools[key]
+        except KeyError:
+            continue
+        stats.append({'host': f'{key.key_scheme}://{key.key_host}:{key.key_port}',
+                      'connections': pool.num_connections,
+                      'requests': pool.num_requests,
+                      'reuse_ratio': 1 - pool.num_connections / pool.num_requests if pool.num_requests else 0.0,
+                      'idle': pool.pool.qsize() if pool.pool else 0})
+    return stats
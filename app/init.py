@@ -2,9 +2,39 @@ from sqlalchemy.orm import sessionmaker
 from sqlalchemy import create_engine
 import openai
 
-from config import sqlalchemy_url, OPENAI_API_KEY
+import contextvars
+import functools
+import random
 
-sql_engine = create_engine(sqlalchemy_url)
+from config import \
+    sqlalchemy_url, \
+    OPENAI_API_KEY, \
+    OPENAI_API_BASE, \
+    READ_REPLICA_URLS, \
+    DB_POOL_SIZE, \
+    DB_MAX_OVERFLOW, \
+    DB_POOL_TIMEOUT
+from http_pool import llm_session
+
+create_pooled_engine = functools.partial(create_engine,
+                                         pool_size=DB_POOL_SIZE,
+                                         max_overflow=DB_MAX_OVERFLOW,
+                                         pool_timeout=DB_POOL_TIMEOUT)
+
+sql_engine = create_pooled_engine(sqlalchemy_url)
 sqlalchemy_session = sessionmaker(sql_engine)
 
-openai.api_key = OPENAI_API_KEY
\ No newline at end of file
+replica_engines = list(map(create_pooled_engine, READ_REPLICA_URLS))
+replica_sessions = list(map(sessionmaker, replica_engines))
+# set per request by the replica routing middleware, True for writes and shortly after a client's write
+use_primary = contextvars.ContextVar('use_primary', default=True)
+
+def read_session() -> sessionmaker:
+    if use_primary.get() or not replica_sessions:
+        return sqlalchemy_session
+    return random.choice(replica_sessions)
+
+openai.api_key = OPENAI_API_KEY
+if OPENAI_API_BASE:
+    openai.api_base = OPENAI_API_BASE
+openai.requestssession = llm_session
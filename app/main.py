@@ -1,16 +1,52 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError
-from  sqlalchemy.exc import IntegrityError
+from  sqlalchemy.exc import IntegrityError, TimeoutError as PoolTimeoutError
+from fastapi.concurrency import run_in_threadpool
+import openai
 
-from config import ORIGINS
+import asyncio
+import logging
+
+from config import \
+    ORIGINS, \
+    READ_REPLICA_URLS, \
+    PROFILING_ENABLED, \
+    PARTITION_MAINTENANCE_INTERVAL, \
+    TEXT_CLEANUP_INTERVAL, \
+    ARCHIVE_INTERVAL
 from workspace.router import router as workspace_router
 from gpt_interactions.router import router as interactions_router
 from questions.router import router as questions_router
 from prompts.router import router as prompts_router
-from exception_handlers import validation_handler, unique_vailation_handler, entity_error_handler
+from changes.router import router as changes_router
+from similar.router import router as similar_router
+from changes.listener import listener
+from exception_handlers import \
+    validation_handler, \
+    unique_vailation_handler, \
+    entity_error_handler, \
+    upstream_unavailable_handler, \
+    upstream_error_handler, \
+    database_overloaded_handler
+from admission import admission_control
+from gpt_interactions.partitions import maintain_partitions
+from gpt_interactions.archive import archive_expired_history
+from prompts.texts import sweep_orphaned_texts
+from init import sql_engine, replica_engines
+from middlewares import replica_routing, profiling
+from profiling import instrument_engines
 
 app = FastAPI()
+logger = logging.getLogger(__name__)
+
+# the last added middleware runs first: CORS wraps admission so 503 rejections still carry CORS headers
+if READ_REPLICA_URLS:
+    app.middleware('http')(replica_routing)
+if PROFILING_ENABLED:
+    instrument_engines([sql_engine, *replica_engines])
+    app.middleware('http')(profiling)
+app.middleware('http')(admission_control)
 
 app.add_middleware(
     CORSMiddleware,
@@ -24,6 +60,53 @@ app.include_router(workspace_router)
 app.include_router(interactions_router)
 app.include_router(questions_router)
 app.include_router(prompts_router)
+app.include_router(changes_router)
+app.include_router(similar_router)
 app.add_exception_handler(RequestValidationError, validation_handler)
 app.add_exception_handler(IntegrityError, unique_vailation_handler)
 app.add_exception_handler(AttributeError, entity_error_handler)
+# raised after DB_POOL_TIMEOUT when no pooled connection frees up
+app.add_exception_handler(PoolTimeoutError, database_overloaded_handler)
+for upstream_unavailable in (openai.error.RateLimitError,
+                             openai.error.ServiceUnavailableError,
+                             openai.error.Timeout,
+                             openai.error.APIConnectionError,
+                             openai.error.TryAgain):
+    app.add_exception_handler(upstream_unavailable, upstream_unavailable_handler)
+app.add_exception_handler(openai.error.OpenAIError, upstream_error_handler)
+
+async def run_periodically(job, interval: int):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_in_threadpool(job)
+        except Exception:
+            logger.exception('%s failed, retrying at the next interval', job.__name__)
+
+@app.on_event('startup')
+def create_and_drop_partitions():
+    # next months' partitions usually exist already, a worker that can't maintain them still serves requests
+    try:
+        maintain_partitions()
+    except Exception:
+        logger.exception('Partition maintenance failed at startup, retrying at the next interval')
+
+@app.on_event('startup')
+async def schedule_maintenance():
+    app.state.maintenance = [asyncio.create_task(run_periodically(maintain_partitions, PARTITION_MAINTENANCE_INTERVAL)),
+                             asyncio.create_task(run_periodically(sweep_orphaned_texts, TEXT_CLEANUP_INTERVAL))]
+    if ARCHIVE_INTERVAL:
+        app.state.maintenance.append(asyncio.create_task(run_periodically(archive_expired_history, ARCHIVE_INTERVAL)))
+
+@app.on_event('startup')
+async def start_change_listener():
+    listener.start(asyncio.get_running_loop())
+
+@app.on_event('shutdown')
+async def stop_change_listener():
+    listener.stop()
+
+@app.on_event('shutdown')
+async def stop_maintenance():
+    for task in app.state.maintenance:
+        task.cancel()
@@ -0,0 +1,52 @@
+from fastapi.concurrency import run_in_threadpool
+
+import logging
+import os
+import random
+import time
+
+from config import READ_YOUR_WRITES_SECONDS, PROFILE_SAMPLE_RATE, PROFILE_TOKEN, PROFILE_DIR
+from init import use_primary
+from profiling import profile_state
+
+LAST_WRITE_COOKIE = 'last_write'
+READ_METHODS = ('GET', 'HEAD', 'OPTIONS')
+PROFILE_HEADER = 'X-Profile'
+
+logger = logging.getLogger(__name__)
+
+
+async def replica_routing(request, call_next):
+    """Reads go to replicas unless the client wrote within READ_YOUR_WRITES_SECONDS, tracked by a cookie
+    so stickiness holds across workers"""
+    write = request.method not in READ_METHODS
+    try:
+        last_write = float(request.cookies.get(LAST_WRITE_COOKIE, 0))
+    except ValueError:
+        last_write = 0
+    use_primary.set(write or time.time() - last_write < READ_YOUR_WRITES_SECONDS)
+    response = await call_next(request)
+    if write:
+        response.set_cookie(LAST_WRITE_COOKIE, str(time.time()), max_age=int(READ_YOUR_WRITES_SECONDS) + 1, httponly=True)
+    return response
+
+
+async def profiling(request, call_next):
+    """Profiles a PROFILE_SAMPLE_RATE share of requests, plus any carrying PROFILE_TOKEN in the X-Profile header.
+    Logs the SQL statement count and writes a pstats file, viewable with snakeviz or flameprof, to PROFILE_DIR"""
+    if random.random() >= PROFILE_SAMPLE_RATE and \
+            (not PROFILE_TOKEN or request.headers.get(PROFILE_HEADER) != PROFILE_TOKEN):
+        return await call_next(request)
+    state = {'statements': 0, 'profile': None}
+    profile_state.set(state)
+    started = time.perf_counter()
+    response = await call_next(request)
+    elapsed = (time.perf_counter() - started) * 1000
+    logger.info('%s %s: %.1f ms, %d SQL statements', request.method, request.url.path, elapsed, state['statements'])
+    response.headers['X-Profile-Statements'] = str(state['statements'])
+    if state['profile'] is not None:
+        path = os.path.join(PROFILE_DIR, f'{time.strftime("%Y%m%d-%H%M%S")}-{request.method}'
+                                         f'{request.url.path.replace("/", "_")}-{elapsed:.0f}ms.prof')
+        await run_in_threadpool(os.makedirs, PROFILE_DIR, exist_ok=True)
+        await run_in_threadpool(state['profile'].dump_stats, path)
+    return response
@@ -0,0 +1,62 @@
+"""add content addressed prompt text
+
+Revision ID: 0b7e5f2c9d14
+Revises: f6a1c7d3b820
+Create Date: 2026-10-19 17:35:52.102784
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0b7e5f2c9d14'
+down_revision = 'f6a1c7d3b820'
+branch_labels = None
+depends_on = None
+
+# the raw 32 byte digest, half the size of its hex form
+TEXT_HASH = "sha256(convert_to(text_data, 'UTF8'))"
+
+
+def upgrade() -> None:
+    op.create_table('prompt_text',
+    sa.Column('hash', sa.LargeBinary(), nullable=False),
+    sa.Column('text_data', sa.String(), nullable=False),
+    sa.PrimaryKeyConstraint('hash')
+    )
+    op.execute(f'INSERT INTO prompt_text SELECT {TEXT_HASH}, text_data FROM filled_prompt '
+               f'UNION SELECT {TEXT_HASH}, text_data FROM favorite_prompt_blank WHERE text_data IS NOT NULL')
+
+    op.add_column('filled_prompt', sa.Column('text_hash', sa.LargeBinary(), nullable=True))
+    op.execute(f'UPDATE filled_prompt SET text_hash = {TEXT_HASH}')
+    op.alter_column('filled_prompt', 'text_hash', nullable=False)
+    op.create_foreign_key(None, 'filled_prompt', 'prompt_text', ['text_hash'], ['hash'])
+    # deleting an orphaned text checks the references, without an index that is a scan of every partition
+    op.create_index('ix_filled_prompt_text_hash', 'filled_prompt', ['text_hash'])
+    op.drop_column('filled_prompt', 'text_data')
+
+    op.add_column('favorite_prompt_blank', sa.Column('text_hash', sa.LargeBinary(), nullable=True))
+    op.execute(f'UPDATE favorite_prompt_blank SET text_hash = {TEXT_HASH}')
+    op.create_foreign_key(None, 'favorite_prompt_blank', 'prompt_text', ['text_hash'], ['hash'])
+    op.create_index('ix_favorite_prompt_blank_text_hash', 'favorite_prompt_blank', ['text_hash'])
+    op.drop_column('favorite_prompt_blank', 'text_data')
+
+
+def downgrade() -> None:
+    op.add_column('favorite_prompt_blank', sa.Column('text_data', sa.String(), nullable=True))
+    op.execute('UPDATE favorite_prompt_blank SET text_data = prompt_text.text_data '
+               'FROM prompt_text WHERE prompt_text.hash = favorite_prompt_blank.text_hash')
+    op.drop_index('ix_favorite_prompt_blank_text_hash', 'favorite_prompt_blank')
+    op.drop_constraint('favorite_prompt_blank_text_hash_fkey', 'favorite_prompt_blank', type_='foreignkey')
+    op.drop_column('favorite_prompt_blank', 'text_hash')
+
+    op.add_column('filled_prompt', sa.Column('text_data', sa.String(), nullable=True))
+    op.execute('UPDATE filled_prompt SET text_data = prompt_text.text_data '
+               'FROM prompt_text WHERE prompt_text.hash = filled_prompt.text_hash')
+    op.alter_column('filled_prompt', 'text_data', nullable=False)
+    op.drop_index('ix_filled_prompt_text_hash', 'filled_prompt')
+    op.drop_constraint('filled_prompt_text_hash_fkey', 'filled_prompt', type_='foreignkey')
+    op.drop_column('filled_prompt', 'text_hash')
+
+    op.drop_table('prompt_text')
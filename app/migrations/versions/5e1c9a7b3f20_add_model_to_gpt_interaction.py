@@ -0,0 +1,24 @@
+"""add model to gpt interaction
+
+Revision ID: 5e1c9a7b3f20
+Revises: 0b7e5f2c9d14
+Create Date: 2026-10-19 22:04:17.830912
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e1c9a7b3f20'
+down_revision = '0b7e5f2c9d14'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('gpt_interaction', sa.Column('model', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('gpt_interaction', 'model')
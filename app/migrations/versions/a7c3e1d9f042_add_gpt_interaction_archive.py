@@ -0,0 +1,33 @@
+"""add gpt interaction archive
+
+Revision ID: a7c3e1d9f042
+Revises: t938q8c1co6w
+Create Date: 2026-10-19 10:12:31.504118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7c3e1d9f042'
+down_revision = 't938q8c1co6w'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('gpt_interaction_archive',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('time_happened', sa.TIMESTAMP(), nullable=False),
+    sa.Column('workspace_id', sa.UUID(), nullable=False),
+    sa.Column('data', sa.LargeBinary(), nullable=False),
+    sa.ForeignKeyConstraint(['workspace_id'], ['workspace.id'], ondelete='cascade'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_gpt_interaction_archive_workspace_id_time_happened', 'gpt_interaction_archive', ['workspace_id', 'time_happened'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_gpt_interaction_archive_workspace_id_time_happened', 'gpt_interaction_archive')
+    op.drop_table('gpt_interaction_archive')
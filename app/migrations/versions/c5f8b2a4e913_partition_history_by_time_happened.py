@@ -0,0 +1,107 @@
+"""partition history by time_happened
+
+Revision ID: c5f8b2a4e913
+Revises: a7c3e1d9f042
+Create Date: 2026-10-19 11:40:05.227461
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5f8b2a4e913'
+down_revision = 'a7c3e1d9f042'
+branch_labels = None
+depends_on = None
+
+CREATE_MONTHLY_PARTITIONS = """
+DO $$
+DECLARE
+    month timestamp;
+BEGIN
+    FOR month IN
+        SELECT generate_series(date_trunc('month', coalesce(min(time_happened), now())),
+                               date_trunc('month', now()) + interval '2 month',
+                               interval '1 month')
+        FROM gpt_interaction_old
+    LOOP
+        EXECUTE format('CREATE TABLE gpt_interaction_p%s PARTITION OF gpt_interaction FOR VALUES FROM (%L) TO (%L)',
+                       to_char(month, 'YYYY_MM'), month, month + interval '1 month');
+        EXECUTE format('CREATE TABLE filled_prompt_p%s PARTITION OF filled_prompt FOR VALUES FROM (%L) TO (%L)',
+                       to_char(month, 'YYYY_MM'), month, month + interval '1 month');
+    END LOOP;
+END $$;
+"""
+
+
+def upgrade() -> None:
+    op.rename_table('filled_prompt', 'filled_prompt_old')
+    op.rename_table('gpt_interaction', 'gpt_interaction_old')
+    op.execute('ALTER TABLE filled_prompt_old RENAME CONSTRAINT filled_prompt_pkey TO filled_prompt_old_pkey')
+    op.execute('ALTER TABLE gpt_interaction_old RENAME CONSTRAINT gpt_interaction_pkey TO gpt_interaction_old_pkey')
+    op.execute("""
+        CREATE TABLE gpt_interaction (
+            id UUID NOT NULL,
+            username VARCHAR NOT NULL,
+            company VARCHAR NOT NULL,
+            time_happened TIMESTAMP NOT NULL,
+            favorite BOOLEAN NOT NULL DEFAULT false,
+            gpt_answer VARCHAR NOT NULL,
+            workspace_id UUID NOT NULL REFERENCES workspace (id) ON DELETE CASCADE,
+            PRIMARY KEY (id, time_happened)
+        ) PARTITION BY RANGE (time_happened)
+    """)
+    op.execute("""
+        CREATE TABLE filled_prompt (
+            id UUID NOT NULL,
+            text_data VARCHAR NOT NULL,
+            gpt_interaction_id UUID NOT NULL,
+            number INTEGER NOT NULL,
+            time_happened TIMESTAMP NOT NULL,
+            PRIMARY KEY (id, time_happened),
+            FOREIGN KEY (gpt_interaction_id, time_happened)
+                REFERENCES gpt_interaction (id, time_happened) ON DELETE CASCADE
+        ) PARTITION BY RANGE (time_happened)
+    """)
+    op.create_index('ix_gpt_interaction_workspace_id_time_happened', 'gpt_interaction', ['workspace_id', 'time_happened'])
+    op.create_index('ix_filled_prompt_gpt_interaction_id', 'filled_prompt', ['gpt_interaction_id'])
+    op.execute(CREATE_MONTHLY_PARTITIONS)
+    op.execute('INSERT INTO gpt_interaction SELECT id, username, company, time_happened, favorite, gpt_answer, workspace_id '
+               'FROM gpt_interaction_old')
+    op.execute('INSERT INTO filled_prompt '
+               'SELECT f.id, f.text_data, f.gpt_interaction_id, f.number, g.time_happened '
+               'FROM filled_prompt_old f JOIN gpt_interaction_old g ON g.id = f.gpt_interaction_id')
+    op.drop_table('filled_prompt_old')
+    op.drop_table('gpt_interaction_old')
+
+
+def downgrade() -> None:
+    op.rename_table('filled_prompt', 'filled_prompt_old')
+    op.rename_table('gpt_interaction', 'gpt_interaction_old')
+    op.execute('ALTER TABLE filled_prompt_old RENAME CONSTRAINT filled_prompt_pkey TO filled_prompt_old_pkey')
+    op.execute('ALTER TABLE gpt_interaction_old RENAME CONSTRAINT gpt_interaction_pkey TO gpt_interaction_old_pkey')
+    op.create_table('gpt_interaction',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('username', sa.String(), nullable=False),
+    sa.Column('company', sa.String(), nullable=False),
+    sa.Column('time_happened', sa.TIMESTAMP(), nullable=False),
+    sa.Column('favorite', sa.BOOLEAN(), nullable=False, server_default='False'),
+    sa.Column('gpt_answer', sa.String(), nullable=False),
+    sa.Column('workspace_id', sa.UUID(), nullable=False),
+    sa.ForeignKeyConstraint(['workspace_id'], ['workspace.id'], ondelete='cascade'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('filled_prompt',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('text_data', sa.String(), nullable=False),
+    sa.Column('gpt_interaction_id', sa.UUID(), nullable=False),
+    sa.Column('number', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['gpt_interaction_id'], ['gpt_interaction.id'], ondelete='cascade'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.execute('INSERT INTO gpt_interaction SELECT id, username, company, time_happened, favorite, gpt_answer, workspace_id '
+               'FROM gpt_interaction_old')
+    op.execute('INSERT INTO filled_prompt SELECT id, text_data, gpt_interaction_id, number FROM filled_prompt_old')
+    op.drop_table('filled_prompt_old')
+    op.drop_table('gpt_interaction_old')
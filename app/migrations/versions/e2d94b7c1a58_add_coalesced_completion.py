@@ -0,0 +1,30 @@
+"""add coalesced completion
+
+Revision ID: e2d94b7c1a58
+Revises: c5f8b2a4e913
+Create Date: 2026-10-19 15:03:47.918220
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2d94b7c1a58'
+down_revision = 'c5f8b2a4e913'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('coalesced_completion',
+    sa.Column('key', sa.String(length=64), nullable=False),
+    sa.Column('answer', sa.String(), nullable=True),
+    sa.Column('created_at', sa.TIMESTAMP(), nullable=False),
+    sa.Column('finished_at', sa.TIMESTAMP(), nullable=True),
+    sa.PrimaryKeyConstraint('key')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('coalesced_completion')
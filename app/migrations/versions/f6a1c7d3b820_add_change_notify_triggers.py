@@ -0,0 +1,59 @@
+"""add change notify triggers
+
+Revision ID: f6a1c7d3b820
+Revises: e2d94b7c1a58
+Create Date: 2026-10-19 16:21:09.640337
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f6a1c7d3b820'
+down_revision = 'e2d94b7c1a58'
+branch_labels = None
+depends_on = None
+
+CHANNEL = 'gpt_writer_changes'
+NOTIFIED_TABLES = ('gpt_interaction', 'workspace', 'match', 'favorite_prompt')
+
+
+NOTIFY_FUNCTION = """
+    CREATE FUNCTION {name}() RETURNS trigger AS $$
+    DECLARE
+        changed RECORD;
+    BEGIN
+        IF TG_OP = 'DELETE' THEN changed := OLD; ELSE changed := NEW; END IF;
+        PERFORM pg_notify('{channel}', json_build_object(
+            'table', TG_ARGV[0],
+            'op', lower(TG_OP),
+            'id', {id},
+            'workspace_id', {workspace_id}
+        )::text);
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+"""
+
+
+def upgrade() -> None:
+    # TG_ARGV[0] carries the parent table name, TG_TABLE_NAME would be the partition for gpt_interaction.
+    # match rows are replaced wholesale, so their events leave out the id and NOTIFY collapses them per transaction
+    op.execute(NOTIFY_FUNCTION.format(name='notify_change', channel=CHANNEL,
+                                      id="CASE WHEN TG_ARGV[0] = 'match' THEN NULL ELSE changed.id END",
+                                      workspace_id='changed.workspace_id'))
+    op.execute(NOTIFY_FUNCTION.format(name='notify_workspace_change', channel=CHANNEL,
+                                      id='changed.id',
+                                      workspace_id='changed.id'))
+    for table in NOTIFIED_TABLES:
+        function = 'notify_workspace_change' if table == 'workspace' else 'notify_change'
+        op.execute(f'CREATE TRIGGER {table}_notify_change AFTER INSERT OR UPDATE OR DELETE ON {table} '
+                   f"FOR EACH ROW EXECUTE FUNCTION {function}('{table}')")
+
+
+def downgrade() -> None:
+    for table in NOTIFIED_TABLES:
+        op.execute(f'DROP TRIGGER {table}_notify_change ON {table}')
+    op.execute('DROP FUNCTION notify_workspace_change()')
+    op.execute('DROP FUNCTION notify_change()')
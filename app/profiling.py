@@ -0,0 +1,61 @@
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+
+import asyncio
+import contextvars
+import cProfile
+import functools
+
+from config import PROFILING_ENABLED
+
+# a dict shared with the handler thread while the current request is sampled, None otherwise
+profile_state = contextvars.ContextVar('profile_state', default=None)
+
+
+def profiled(endpoint):
+    # include_router rebuilds routes from the already wrapped endpoint
+    if getattr(endpoint, 'profiled', False):
+        return endpoint
+    if asyncio.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            state = profile_state.get()
+            if state is None:
+                return await endpoint(*args, **kwargs)
+            state['profile'] = profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                profiler.disable()
+    else:
+        # sync handlers run in a threadpool thread, cProfile has to be enabled from inside it
+        @functools.wraps(endpoint)
+        def wrapper(*args, **kwargs):
+            state = profile_state.get()
+            if state is None:
+                return endpoint(*args, **kwargs)
+            state['profile'] = profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                return endpoint(*args, **kwargs)
+            finally:
+                profiler.disable()
+    wrapper.profiled = True
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    def __init__(self, path: str, endpoint, **kwargs):
+        super().__init__(path, profiled(endpoint) if PROFILING_ENABLED else endpoint, **kwargs)
+
+
+def count_statement(conn, cursor, statement, parameters, context, executemany):
+    state = profile_state.get()
+    if state is not None:
+        state['statements'] += 1
+
+
+def instrument_engines(engines: list):
+    for engine in engines:
+        event.listen(engine, 'before_cursor_execute', count_statement)
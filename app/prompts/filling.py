@@ -0,0 +1,16 @@
+import functools
+import re
+
+
+@functools.lru_cache(maxsize=256)
+def build_matcher(placeholders: tuple[str, ...]) -> re.Pattern:
+    """One alternation over all placeholders, longest first so overlapping questions resolve to the longest match"""
+    return re.compile('|'.join(map(re.escape, sorted(placeholders, key=len, reverse=True))))
+
+
+def fill_prompt(blanks: list[str], answers: dict[str, str]) -> list[str]:
+    answers = {question: answer for question, answer in answers.items() if question and answer is not None}
+    if not answers:
+        return blanks
+    matcher = build_matcher(tuple(sorted(answers)))
+    return list(map(lambda blank: matcher.sub(lambda match: answers[match.group(0)], blank), blanks))
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, TIMESTAMP, ForeignKey, UUID
+from sqlalchemy import Column, String, TIMESTAMP, ForeignKey, UUID, LargeBinary
 from sqlalchemy.ext.declarative import declarative_base
 
 import datetime
@@ -30,14 +30,23 @@ class FavoritePrompt(Base):
     date_added = Column(TIMESTAMP, nullable=False)
     workspace_id = Column(ForeignKey('workspace.id', ondelete='cascade'), nullable=False)
 
+class PromptText(Base):
+    """Content addressed prompt fragments shared by every filled and favorite prompt, keyed by the sha256 digest"""
+    def __init__(self, hash: bytes, text_data: str):
+        self.hash = hash
+        self.text_data = text_data
+    __tablename__ = 'prompt_text'
+    hash = Column(LargeBinary, primary_key=True)
+    text_data = Column(String, nullable=False)
+
 class FavoritePromptBlank(Base):
-    def __init__(self, id: uuid.UUID, favorite_prompt_id: uuid.UUID, text_data: str):
+    def __init__(self, id: uuid.UUID, favorite_prompt_id: uuid.UUID, text_hash: bytes | None):
         self.id = id
         self.favorite_prompt_id = favorite_prompt_id
-        self.text_data = text_data
+        self.text_hash = text_hash
     __tablename__ = 'favorite_prompt_blank'
     id = Column(UUID, primary_key=True)
     favorite_prompt_id = Column(UUID, ForeignKey('favorite_prompt.id', ondelete='cascade'), nullable=False)
-    text_data = Column(String)
+    text_hash = Column(LargeBinary, ForeignKey('prompt_text.hash'))
 
 Base.metadata.reflect(bind=sql_engine)
@@ -1,13 +1,16 @@
 from fastapi import APIRouter
-from sqlalchemy import func, desc
+from sqlalchemy import func, desc, select
+from sqlalchemy.orm import Session
 
 import datetime
 import uuid
 from zoneinfo import ZoneInfo
 
 from workspace.models import Workspace
-from prompts.models import PromptBlank, FavoritePromptBlank, FavoritePrompt
-from init import sqlalchemy_session
+from prompts.models import PromptBlank, FavoritePromptBlank, FavoritePrompt, PromptText
+from prompts.texts import store_texts, delete_orphaned_texts
+from profiling import ProfiledRoute
+from init import sqlalchemy_session, read_session
 from prompts.schemas import\
     FavoritePromptsTimeResponse,\
     FavoritePromptTimeSchema,\
@@ -17,22 +20,26 @@ from prompts.schemas import\
     FavoritePromptTimeResponse
 
 router = APIRouter(prefix='/api',
+                   route_class=ProfiledRoute,
                    tags=['Prompts'])
 
+def favorite_prompt_list(session: Session) -> list[FavoritePromptTimeSchema]:
+    favorite_prompts = session.query(FavoritePrompt, func.array_agg(PromptText.text_data))\
+        .filter(FavoritePrompt.workspace_id == session.query(Workspace.id).filter(Workspace.initial).first()[0]) \
+        .join(FavoritePromptBlank).outerjoin(PromptText, PromptText.hash == FavoritePromptBlank.text_hash).group_by(FavoritePrompt.id).order_by(desc(FavoritePrompt.date_added)).all()
+    return list(map(lambda p: FavoritePromptTimeSchema(id=p[0].id,
+                                                       title=p[0].title,
+                                                       date_added=p[0].date_added,
+                                                       prompt=p[1]), favorite_prompts))
+
 def get_favorite_prompts_(message: str) -> FavoritePromptsTimeResponse:
-    with sqlalchemy_session.begin() as session:
-        favorite_prompts = session.query(FavoritePrompt, func.array_agg(FavoritePromptBlank.text_data))\
-            .filter(FavoritePrompt.workspace_id == session.query(Workspace.id).filter(Workspace.initial).first()[0]) \
-            .join(FavoritePromptBlank).group_by(FavoritePrompt.id).order_by(desc(FavoritePrompt.date_added)).all()
-        favorite_prompts = list(map(lambda p: FavoritePromptTimeSchema(id=p[0].id,
-                                                                  title=p[0].title,
-                                                                  date_added=p[0].date_added,
-                                                                  prompt=p[1]), favorite_prompts))
+    with read_session().begin() as session:
+        favorite_prompts = favorite_prompt_list(session)
     return FavoritePromptsTimeResponse(status='success', message=message, data=favorite_prompts)
 
 @router.get('/prompt')
 def get_prompt() -> PromptsResponse:
-    with sqlalchemy_session.begin() as session:
+    with read_session().begin() as session:
         prompts = session.query(PromptBlank) \
             .filter(PromptBlank.workspace_id == session.query(Workspace.id).filter(Workspace.initial).first()[0]) \
             .all()
@@ -64,10 +71,10 @@ def put_favorite_prompts(prompt: FavoritePromptSchema) -> FavoritePromptTimeResp
                                    date_added=date_added,
                                    workspace_id=session.query(Workspace.id).filter(Workspace.initial).first()[0]))
         session.flush()
-        session.add_all(list(map(lambda p: FavoritePromptBlank(id=uuid.UUID(hex=str(uuid.uuid4())),
+        session.add_all(list(map(lambda h: FavoritePromptBlank(id=uuid.UUID(hex=str(uuid.uuid4())),
                                                                favorite_prompt_id=prompt.id,
-                                                               text_data=p),
-                                 prompt.prompt)))
+                                                               text_hash=h),
+                                 store_texts(session, prompt.prompt))))
         favorite_prompt = FavoritePromptTimeSchema(id=prompt.id, title=prompt.title, prompt=prompt.prompt, date_added=date_added)
     return FavoritePromptTimeResponse(status='success', message='Favorite prompt successfully saved', data=favorite_prompt)
 
@@ -76,5 +83,11 @@ def delete_favorite_prompts(id: uuid.UUID) -> FavoritePromptsTimeResponse:
     with sqlalchemy_session.begin() as session:
         prompt = session.get(FavoritePrompt, id)
         if not prompt: raise AttributeError("Id doesn't exist")
+        hashes = session.execute(select(FavoritePromptBlank.text_hash)
+                                 .where(FavoritePromptBlank.favorite_prompt_id == id,
+                                        FavoritePromptBlank.text_hash.is_not(None))).scalars().all()
         session.delete(prompt)
-    return get_favorite_prompts_('Favorite prompt successfully deleted')
+        session.flush()
+        delete_orphaned_texts(session, hashes)
+        favorite_prompts = favorite_prompt_list(session)
+    return FavoritePromptsTimeResponse(status='success', message='Favorite prompt successfully deleted', data=favorite_prompts)
@@ -0,0 +1,58 @@
+from sqlalchemy import select, delete, exists
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+import hashlib
+
+from prompts.models import PromptText, FavoritePromptBlank
+from gpt_interactions.models import FilledPrompt
+from init import sqlalchemy_session
+from config import TEXT_CLEANUP_BATCH_SIZE
+
+
+def text_hash(text: str) -> bytes:
+    return hashlib.sha256(text.encode()).digest()
+
+
+def store_texts(session: Session, texts: list[str | None]) -> list[bytes | None]:
+    """Stores each distinct text once and returns the hashes to reference them by, in the order given.
+    The rows stay locked FOR KEY SHARE until commit, so orphan cleanup can't delete them before they're referenced."""
+    hashes = list(map(lambda text: text_hash(text) if text is not None else None, texts))
+    missing = {h: text for h, text in zip(hashes, texts) if h is not None}
+    while missing:
+        session.execute(insert(PromptText)
+                        .values(list(map(lambda item: {'hash': item[0], 'text_data': item[1]}, sorted(missing.items()))))
+                        .on_conflict_do_nothing())
+        locked = set(session.execute(select(PromptText.hash)
+                                     .where(PromptText.hash.in_(list(missing)))
+                                     .with_for_update(read=True, key_share=True)).scalars())
+        # a row deleted by a cleanup that committed in between is inserted again
+        missing = {h: text for h, text in missing.items() if h not in locked}
+    return hashes
+
+
+def delete_orphaned_texts(session: Session, hashes: list[bytes] | None = None, limit: int | None = None) -> int:
+    """Deletes texts no filled or favorite prompt references anymore, only among hashes when given.
+    Rows locked by a concurrent store_texts are skipped and left to the next cleanup."""
+    orphaned = select(PromptText.hash) \
+        .where(~exists().where(FilledPrompt.text_hash == PromptText.hash),
+               ~exists().where(FavoritePromptBlank.text_hash == PromptText.hash)) \
+        .limit(limit) \
+        .with_for_update(skip_locked=True)
+    if hashes is not None:
+        orphaned = orphaned.where(PromptText.hash.in_(hashes))
+    try:
+        with session.begin_nested():
+            return session.execute(delete(PromptText).where(PromptText.hash.in_(orphaned.scalar_subquery()))).rowcount
+    except IntegrityError:
+        # a transaction that committed a reference after this statement's snapshot, the next cleanup retries
+        return 0
+
+
+def sweep_orphaned_texts():
+    """Catches texts orphaned by cascading deletes, e.g. of a workspace, in batches of their own transactions"""
+    deleted = TEXT_CLEANUP_BATCH_SIZE
+    while deleted == TEXT_CLEANUP_BATCH_SIZE:
+        with sqlalchemy_session.begin() as session:
+            deleted = delete_orphaned_texts(session, limit=TEXT_CLEANUP_BATCH_SIZE)
@@ -2,15 +2,17 @@ from fastapi import APIRouter
 
 from workspace.models import Workspace
 from questions.models import Match
-from init import sqlalchemy_session
+from profiling import ProfiledRoute
+from init import sqlalchemy_session, read_session
 from questions.schemas import MatchSchema, MatchResponse
 
 router = APIRouter(prefix='/api/questions',
+                   route_class=ProfiledRoute,
                    tags=['Questions'])
 
 @router.get('')
 def get_questions() -> MatchResponse:
-    with sqlalchemy_session.begin() as session:
+    with read_session().begin() as session:
         matches = session.query(Match)\
             .filter(Match.workspace_id == session.query(Workspace.id).filter(Workspace.initial).first()[0])\
             .all()
@@ -0,0 +1,29 @@
+import numpy as np
+
+import hashlib
+import re
+
+from config import EMBEDDING_DIM
+
+TOKEN = re.compile(r'\w+')
+
+
+def features(text: str) -> list[str]:
+    words = TOKEN.findall(text.lower())
+    return words + list(map(' '.join, zip(words, words[1:])))
+
+
+def hashing_embedding(texts: list[str]) -> np.ndarray:
+    """Offline default: signed feature hashing of words and word bigrams with sublinear counts, L2 normalized"""
+    vectors = np.zeros((len(texts), EMBEDDING_DIM), dtype=np.float32)
+    for row, text in enumerate(texts):
+        digests = list(map(lambda f: int.from_bytes(hashlib.blake2b(f.encode(), digest_size=8).digest(), 'little'),
+                           features(text)))
+        if not digests:
+            continue
+        digests = np.array(digests, dtype=np.uint64)
+        np.add.at(vectors[row], (digests % EMBEDDING_DIM).astype(np.intp),
+                  np.where(digests >> np.uint64(63), -1.0, 1.0).astype(np.float32))
+        vectors[row] = np.sign(vectors[row]) * np.log1p(np.abs(vectors[row]))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
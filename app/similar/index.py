@@ -0,0 +1,157 @@
+import numpy as np
+
+import contextlib
+import fcntl
+import importlib
+import logging
+import os
+import threading
+import uuid
+from typing import Iterable
+
+from config import EMBEDDING_FUNCTION, EMBEDDING_DIM, EMBEDDING_DIR
+
+ID_SIZE = 16
+VECTOR_SIZE = EMBEDDING_DIM * np.dtype(np.float32).itemsize
+
+module_name, function_name = EMBEDDING_FUNCTION.rsplit('.', 1)
+embed = getattr(importlib.import_module(module_name), function_name)
+
+logger = logging.getLogger(__name__)
+
+
+class WorkspaceIndex:
+    """Unit vectors of one workspace's prompts in two append-only files: raw uuid bytes and raw float32 rows.
+    Searches memory map the vectors and remap only when another thread or worker appended to them.
+    Readers hold a shared flock and writers an exclusive one, so nobody sees the two files out of step."""
+    def __init__(self, workspace_id: str):
+        self.path = os.path.join(EMBEDDING_DIR, workspace_id)
+        self.lock = threading.Lock()
+        self.version = ()
+        self.ids = np.empty((0, ID_SIZE), dtype=np.uint8)
+        self.vectors = np.empty((0, EMBEDDING_DIM), dtype=np.float32)
+
+    @contextlib.contextmanager
+    def file_lock(self, operation: int):
+        os.makedirs(EMBEDDING_DIR, exist_ok=True)
+        with open(self.path + '.lock', 'a') as lock:
+            fcntl.flock(lock, operation)
+            yield
+
+    def stat(self) -> tuple | None:
+        """(ids inode, vectors inode, rows) of the current files, call with the flock held"""
+        try:
+            ids_stat, vec_stat = os.stat(self.path + '.ids'), os.stat(self.path + '.vec')
+        except FileNotFoundError:
+            return None
+        # a rebuild swaps the files, so the inodes are part of the version next to the row count
+        return ids_stat.st_ino, vec_stat.st_ino, min(ids_stat.st_size // ID_SIZE, vec_stat.st_size // VECTOR_SIZE)
+
+    def load(self):
+        with self.file_lock(fcntl.LOCK_SH):
+            version = self.stat()
+            if version == self.version:
+                return
+            if version and version[2]:
+                self.ids = np.memmap(self.path + '.ids', dtype=np.uint8, mode='r', shape=(version[2], ID_SIZE))
+                self.vectors = np.memmap(self.path + '.vec', dtype=np.float32, mode='r',
+                                         shape=(version[2], EMBEDDING_DIM))
+            else:
+                self.ids = np.empty((0, ID_SIZE), dtype=np.uint8)
+                self.vectors = np.empty((0, EMBEDDING_DIM), dtype=np.float32)
+            self.version = version
+
+    def snapshot(self) -> tuple | None:
+        """Taken before reading the interactions a rebuild embeds, replace() carries over rows appended since"""
+        with self.lock, self.file_lock(fcntl.LOCK_SH):
+            return self.stat()
+
+    def append(self, ids: list[uuid.UUID], vectors: np.ndarray):
+        with self.lock, self.file_lock(fcntl.LOCK_EX):
+            # both files must grow by the same rows in the same order, also across workers
+            with open(self.path + '.ids', 'ab') as f:
+                f.write(b''.join(map(lambda i: i.bytes, ids)))
+            with open(self.path + '.vec', 'ab') as f:
+                f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+
+    def carry_over(self, snapshot: tuple | None, ids_file, vec_file):
+        """Copies rows appended to the current files after the snapshot and missing in the new files,
+        call with the exclusive flock held. When another rebuild swapped the files in between,
+        every current row is a candidate."""
+        version = self.stat()
+        if version is None:
+            return
+        since = snapshot[2] if snapshot and snapshot[:2] == version[:2] else 0
+        appended = np.fromfile(self.path + '.ids', dtype=np.uint8, count=version[2] * ID_SIZE) \
+            .reshape(-1, ID_SIZE)[since:]
+        if not len(appended):
+            return
+        ids_file.flush()
+        written = np.fromfile(ids_file.name, dtype=np.uint64).reshape(-1, 2)
+        keys = appended.view(np.uint64)
+        new = np.ones(len(keys), dtype=bool)
+        # rows appended while the snapshot was read may be in both, a prefix match is verified on all 16 bytes
+        for row in np.flatnonzero(np.isin(keys[:, 0], written[:, 0])):
+            new[row] = not (written == keys[row]).all(axis=1).any()
+        vectors = np.fromfile(self.path + '.vec', dtype=np.float32, count=version[2] * EMBEDDING_DIM) \
+            .reshape(-1, EMBEDDING_DIM)[since:]
+        ids_file.write(appended[new].tobytes())
+        vec_file.write(np.ascontiguousarray(vectors[new]).tobytes())
+
+    def replace(self, batches: Iterable[tuple[list[uuid.UUID], np.ndarray]], snapshot: tuple | None = None) -> int:
+        """Writes the batches to temporary files and swaps them in, searches and appends keep using the old files
+        until then. Rows appended after the snapshot are carried over at the swap. Returns the rows written."""
+        os.makedirs(EMBEDDING_DIR, exist_ok=True)
+        # per process names, so concurrent rebuilds in two workers don't write to the same temporary files
+        ids_tmp, vec_tmp = f'{self.path}.ids.{os.getpid()}.tmp', f'{self.path}.vec.{os.getpid()}.tmp'
+        rows = 0
+        with open(ids_tmp, 'wb') as ids_file, open(vec_tmp, 'wb') as vec_file:
+            for ids, vectors in batches:
+                ids_file.write(b''.join(map(lambda i: i.bytes, ids)))
+                vec_file.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+                rows += len(ids)
+            with self.lock, self.file_lock(fcntl.LOCK_EX):
+                self.carry_over(snapshot, ids_file, vec_file)
+                ids_file.flush()
+                vec_file.flush()
+                os.replace(vec_tmp, self.path + '.vec')
+                os.replace(ids_tmp, self.path + '.ids')
+        return rows
+
+    def search(self, query: np.ndarray, k: int) -> list[tuple[uuid.UUID, float]]:
+        with self.lock:
+            self.load()
+            ids, vectors = self.ids, self.vectors
+        if not len(ids):
+            return []
+        scores = vectors @ query
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return list(map(lambda i: (uuid.UUID(bytes=ids[i].tobytes()), float(scores[i])), top))
+
+
+indexes: dict[str, WorkspaceIndex] = {}
+indexes_lock = threading.Lock()
+
+
+def workspace_index(workspace_id: uuid.UUID) -> WorkspaceIndex:
+    with indexes_lock:
+        return indexes.setdefault(str(workspace_id), WorkspaceIndex(str(workspace_id)))
+
+
+def prompt_text(prompt: list[str]) -> str:
+    return '\n'.join(prompt)
+
+
+def index_interaction(workspace_id: uuid.UUID, interaction_id: uuid.UUID, prompt: list[str]):
+    """Called after the interaction is committed, a failed append only costs a stale index until the next rebuild.
+    The embedding function is pluggable, so any of its errors is logged here instead of failing the request."""
+    try:
+        workspace_index(workspace_id).append([interaction_id], embed([prompt_text(prompt)]))
+    except Exception:
+        logger.exception('Failed to index interaction %s', interaction_id)
+
+
+def search(workspace_id: uuid.UUID, prompt: list[str], k: int) -> list[tuple[uuid.UUID, float]]:
+    return workspace_index(workspace_id).search(embed([prompt_text(prompt)])[0], k)
@@ -0,0 +1,75 @@
+from fastapi import APIRouter
+from sqlalchemy import func, and_
+
+import itertools
+from typing import Iterable
+
+from workspace.models import Workspace
+from gpt_interactions.models import GptInteraction, FilledPrompt
+from gpt_interactions.router import interaction_list
+from gpt_interactions.archive import ordered_prompt
+from prompts.models import PromptText
+from similar.index import embed, search, workspace_index, prompt_text
+from similar.schemas import \
+    SimilarRequestSchema, \
+    SimilarAnswerSchema, \
+    SimilarAnswersResponse, \
+    IndexRebuildSchema, \
+    IndexRebuildResponse
+from profiling import ProfiledRoute
+from init import read_session
+
+router = APIRouter(prefix='/api/similarAnswers',
+                   route_class=ProfiledRoute,
+                   tags=['Similar Answers'])
+
+# hits may point to archived or deleted interactions, over-fetching keeps k results after filtering them
+OVERFETCH = 2
+REBUILD_BATCH_SIZE = 10000
+
+def embedded_batches(rows: Iterable) -> Iterable:
+    """Embeds REBUILD_BATCH_SIZE interactions at a time, so a large workspace is never held in memory at once"""
+    rows = iter(rows)
+    while batch := list(itertools.islice(rows, REBUILD_BATCH_SIZE)):
+        yield list(map(lambda r: r.id, batch)), \
+            embed(list(map(lambda r: prompt_text(ordered_prompt(r.text_data, r.numbers)), batch)))
+
+@router.put('')
+def get_similar_answers(request: SimilarRequestSchema) -> SimilarAnswersResponse:
+    with read_session().begin() as session:
+        workspace_id = session.query(Workspace.id).filter(Workspace.initial).first()[0]
+        scores = dict(search(workspace_id, request.prompt, request.k * OVERFETCH))
+        interactions = interaction_list(session, ids=list(scores))
+    answers = sorted(map(lambda i: SimilarAnswerSchema(score=scores[i.id], interaction=i), interactions),
+                     key=lambda a: a.score, reverse=True)[:request.k]
+    return SimilarAnswersResponse(status='success', message='Similar answers successfully retrieved', data=answers)
+
+@router.put('/rebuild')
+def rebuild_index() -> IndexRebuildResponse:
+    with read_session().begin() as session:
+        workspace_ids = set(map(lambda w: w[0], session.query(Workspace.id).all()))
+        workspaces = len(workspace_ids)
+        # taken before the interactions are read, rows appended from here on are carried over by replace()
+        snapshots = {workspace_id: workspace_index(workspace_id).snapshot() for workspace_id in workspace_ids}
+        rows = session.query(GptInteraction.id,
+                             GptInteraction.workspace_id,
+                             func.array_agg(PromptText.text_data).label('text_data'),
+                             func.array_agg(FilledPrompt.number).label('numbers')) \
+            .join(FilledPrompt, and_(FilledPrompt.gpt_interaction_id == GptInteraction.id,
+                                     FilledPrompt.time_happened == GptInteraction.time_happened)) \
+            .join(PromptText, PromptText.hash == FilledPrompt.text_hash) \
+            .group_by(GptInteraction.id, GptInteraction.time_happened) \
+            .order_by(GptInteraction.workspace_id) \
+            .yield_per(REBUILD_BATCH_SIZE)
+        interactions = 0
+        for workspace_id, workspace_rows in itertools.groupby(rows, key=lambda r: r.workspace_id):
+            interactions += workspace_index(workspace_id).replace(embedded_batches(workspace_rows),
+                                                                  snapshots.get(workspace_id))
+            workspace_ids.discard(workspace_id)
+    # every workspace gets rebuilt, ones without interactions end up with an empty index
+    for workspace_id in workspace_ids:
+        workspace_index(workspace_id).replace([], snapshots[workspace_id])
+    return IndexRebuildResponse(status='success',
+                                message='Similar answers index successfully rebuilt',
+                                data=IndexRebuildSchema(workspaces=workspaces,
+                                                        interactions=interactions))
@@ -0,0 +1,24 @@
+from pydantic import BaseModel, conint
+
+from utils import BaseResponse
+from gpt_interactions.schemas import InteractionSchema
+
+MAX_K = 100
+
+class SimilarRequestSchema(BaseModel):
+    prompt: list[str]
+    k: conint(gt=0, le=MAX_K) = 5
+
+class SimilarAnswerSchema(BaseModel):
+    score: float
+    interaction: InteractionSchema
+
+class SimilarAnswersResponse(BaseResponse):
+    data: list[SimilarAnswerSchema]
+
+class IndexRebuildSchema(BaseModel):
+    workspaces: int
+    interactions: int
+
+class IndexRebuildResponse(BaseResponse):
+    data: IndexRebuildSchema
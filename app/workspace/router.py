@@ -1,19 +1,26 @@
 from fastapi import APIRouter
+from sqlalchemy import update, or_
+from sqlalchemy.orm import Session
 
 import uuid
 
 from workspace.models import Workspace
-from init import  sqlalchemy_session
+from profiling import ProfiledRoute
+from init import  sqlalchemy_session, read_session
 from workspace.schemas import WorkspaceSchema, WorkspaceResponse, NewWorkspaceSchema
 
 router = APIRouter(prefix='/api/workspace',
+                   route_class=ProfiledRoute,
                    tags=['Workspace'])
 
+def workspace_list(session: Session) -> list[WorkspaceSchema]:
+    return list(map(lambda w: WorkspaceSchema(id=w.id,
+                                              title=w.title,
+                                              initial=w.initial), session.query(Workspace).all()))
+
 def get_workspace_list(message: str) -> WorkspaceResponse:
-    with sqlalchemy_session.begin() as session:
-        workspaces = list(map(lambda w: WorkspaceSchema(id=w.id,
-                                                        title=w.title,
-                                                        initial=w.initial), session.query(Workspace).all()))
+    with read_session().begin() as session:
+        workspaces = workspace_list(session)
     return WorkspaceResponse(status='success', message=message, data=workspaces)
 
 @router.get('')
@@ -30,16 +37,23 @@ def add_edit_workspace(workspace: NewWorkspaceSchema) -> WorkspaceResponse:
                                   initial=False))
         else:
             old_workspace.title = workspace.title
-    return get_workspace_list(f'workspace successfully {"edited" if old_workspace else "added"}')
+        session.flush()
+        workspaces = workspace_list(session)
+    return WorkspaceResponse(status='success',
+                             message=f'workspace successfully {"edited" if old_workspace else "added"}',
+                             data=workspaces)
 
 @router.put('')
 def goto_workspace(id: uuid.UUID) -> WorkspaceResponse:
     with sqlalchemy_session.begin() as session:
-        new_workspace = session.get(Workspace, id)
-        if new_workspace is None: raise AttributeError("workspace doesn't exist")
-        session.query(Workspace).filter(Workspace.initial).first().initial = False
-        new_workspace.initial = True
-    return get_workspace_list('Initial Workspace successfully changed')
+        # only the old and the new initial workspace are rewritten, each rewritten row notifies subscribers
+        changed = session.execute(update(Workspace)
+                                  .where(or_(Workspace.initial, Workspace.id == id))
+                                  .values(initial=Workspace.id == id)
+                                  .returning(Workspace.initial)).scalars().all()
+        if not any(changed): raise AttributeError("workspace doesn't exist")
+        workspaces = workspace_list(session)
+    return WorkspaceResponse(status='success', message='Initial Workspace successfully changed', data=workspaces)
 
 @router.delete('')
 def delete_workspace(id: uuid.UUID) -> WorkspaceResponse:
@@ -48,4 +62,6 @@ def delete_workspace(id: uuid.UUID) -> WorkspaceResponse:
         if workspace is None: raise AttributeError("Id doesn't exist")
         if workspace.initial: raise AttributeError("Can't remove initial workspace")
         session.delete(workspace)
-    return get_workspace_list('Workspaces successfully deleted')
+        session.flush()
+        workspaces = workspace_list(session)
+    return WorkspaceResponse(status='success', message='Workspaces successfully deleted', data=workspaces)
@@ -0,0 +1,78 @@
+"""Local stand-in for the OpenAI chat completions API.
+
+Point the app at it with OPENAI_API_BASE=http://127.0.0.1:<port>/v1
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import argparse
+import json
+import random
+import time
+import uuid
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    latency = 0.5
+    tokens_per_second = 50.0
+    answer_tokens = 100
+    rate_limit_ratio = 0.0
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        if random.random() < self.rate_limit_ratio:
+            return self.respond(429, {'error': {'message': 'Rate limit reached', 'type': 'requests', 'code': None}},
+                                {'Retry-After': '1'})
+        prompt = '\n'.join(message['content'] for message in body.get('messages', []))
+        prompt_tokens = len(prompt) // 4
+        time.sleep(self.latency + self.answer_tokens / self.tokens_per_second)
+        self.respond(200, {
+            'id': f'chatcmpl-{uuid.uuid4().hex}',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': body.get('model', 'gpt-4'),
+            'choices': [{'index': 0,
+                         'message': {'role': 'assistant', 'content': ' '.join(['token'] * self.answer_tokens)},
+                         'finish_reason': 'stop'}],
+            'usage': {'prompt_tokens': prompt_tokens,
+                      'completion_tokens': self.answer_tokens,
+                      'total_tokens': prompt_tokens + self.answer_tokens},
+        })
+
+    def respond(self, status: int, payload: dict, headers: dict | None = None):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(host: str, port: int, latency: float, tokens_per_second: float, answer_tokens: int, rate_limit_ratio: float):
+    handler = type('ConfiguredFakeOpenAIHandler', (FakeOpenAIHandler,), {
+        'latency': latency,
+        'tokens_per_second': tokens_per_second,
+        'answer_tokens': answer_tokens,
+        'rate_limit_ratio': rate_limit_ratio,
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--latency', type=float, default=0.5, help='seconds before the first token')
+    parser.add_argument('--tokens-per-second', type=float, default=50.0)
+    parser.add_argument('--answer-tokens', type=int, default=100)
+    parser.add_argument('--rate-limit-ratio', type=float, default=0.0, help='share of requests answered with 429')
+    args = parser.parse_args()
+    serve(args.host, args.port, args.latency, args.tokens_per_second, args.answer_tokens, args.rate_limit_ratio)\
+        .serve_forever()
@@ -0,0 +1,178 @@
+"""Drives a weighted mix of API traffic against the app and reports per-route latency percentiles.
+
+Starts the fake OpenAI server and `uvicorn main:app` as subprocesses, so only the load generator runs in
+this process and doesn't compete with the app for the GIL. Run it from the repository root with the app
+environment (DB_* variables) set:
+    python bench/run.py --duration 60 --concurrency 32 --workers 4 --output results.json --baseline baseline.json
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.join(BENCH_DIR, '..', 'app')
+STARTUP_TIMEOUT = 60
+
+ROUTES = {
+    'PUT /api/response': lambda: ('PUT', '/api/response', {'prompt': ['Write a short text for', 'a product launch'],
+                                                          'username': 'bench',
+                                                          'company': 'bench'}),
+    'GET /api/history': lambda: ('GET', '/api/history', None),
+    'GET /api/questions': lambda: ('GET', '/api/questions', None),
+    'GET /api/prompt': lambda: ('GET', '/api/prompt', None),
+}
+DEFAULT_MIX = 'PUT /api/response=1,GET /api/history=4,GET /api/questions=3,GET /api/prompt=3'
+
+
+def percentile(samples: list[float], share: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(share * len(ordered)))]
+
+
+def parse_mix(mix: str) -> dict[str, float]:
+    weights = dict(map(lambda item: (item.rsplit('=', 1)[0], float(item.rsplit('=', 1)[1])), mix.split(',')))
+    unknown = set(weights) - set(ROUTES)
+    if unknown:
+        raise SystemExit(f'Unknown routes in mix: {", ".join(sorted(unknown))}')
+    return weights
+
+
+def wait_for_port(host: str, port: int, process: subprocess.Popen):
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f'{process.args[0]} exited with {process.returncode} during startup')
+        try:
+            socket.create_connection((host, port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise SystemExit(f'Nothing listens on {host}:{port} after {STARTUP_TIMEOUT}s')
+
+
+def start_fake_openai(args) -> subprocess.Popen:
+    process = subprocess.Popen([sys.executable, os.path.join(BENCH_DIR, 'fake_openai.py'),
+                                '--host', args.host,
+                                '--port', str(args.openai_port),
+                                '--latency', str(args.openai_latency),
+                                '--tokens-per-second', str(args.openai_tokens_per_second),
+                                '--rate-limit-ratio', str(args.openai_rate_limit_ratio)])
+    wait_for_port(args.host, args.openai_port, process)
+    return process
+
+
+def start_app(args) -> subprocess.Popen:
+    process = subprocess.Popen([sys.executable, '-m', 'uvicorn', 'main:app',
+                                '--host', args.host,
+                                '--port', str(args.port),
+                                '--workers', str(args.workers),
+                                '--log-level', 'warning'],
+                               cwd=APP_DIR,
+                               env={**os.environ, 'OPENAI_API_BASE': f'http://{args.host}:{args.openai_port}/v1'})
+    wait_for_port(args.host, args.port, process)
+    return process
+
+
+def client_loop(host: str, port: int, weights: dict[str, float], deadline: float, results: dict, lock: threading.Lock):
+    connection = http.client.HTTPConnection(host, port, timeout=300)
+    names, route_weights = list(weights), list(weights.values())
+    while time.monotonic() < deadline:
+        name = random.choices(names, route_weights)[0]
+        method, path, body = ROUTES[name]()
+        started = time.perf_counter()
+        try:
+            connection.request(method, path, body=json.dumps(body) if body is not None else None,
+                               headers={'Content-Type': 'application/json'})
+            response = connection.getresponse()
+            response.read()
+            ok = response.status < 400
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            connection = http.client.HTTPConnection(host, port, timeout=300)
+            ok = False
+        elapsed = time.perf_counter() - started
+        with lock:
+            # fast rejections would otherwise pull the percentiles down exactly when the app is overloaded
+            route = results.setdefault(name, {'latencies': [], 'error_latencies': []})
+            route['latencies' if ok else 'error_latencies'].append(elapsed)
+    connection.close()
+
+
+def summarize(results: dict, elapsed: float) -> dict:
+    """Throughput and percentiles are of successful requests, errors get their own median"""
+    return {name: {'requests': len(route['latencies']) + len(route['error_latencies']),
+                   'errors': len(route['error_latencies']),
+                   'throughput': len(route['latencies']) / elapsed,
+                   'p50_ms': percentile(route['latencies'], 0.50) * 1000,
+                   'p95_ms': percentile(route['latencies'], 0.95) * 1000,
+                   'p99_ms': percentile(route['latencies'], 0.99) * 1000,
+                   'error_p50_ms': percentile(route['error_latencies'], 0.50) * 1000}
+            for name, route in sorted(results.items())}
+
+
+def print_report(report: dict, baseline: dict | None):
+    print(f'{"route":<24}{"req":>8}{"err":>6}{"rps":>9}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}{"err p50":>10}')
+    for name, route in report.items():
+        print(f'{name:<24}{route["requests"]:>8}{route["errors"]:>6}{route["throughput"]:>9.1f}'
+              f'{route["p50_ms"]:>10.1f}{route["p95_ms"]:>10.1f}{route["p99_ms"]:>10.1f}{route["error_p50_ms"]:>10.1f}')
+        if baseline and name in baseline:
+            deltas = map(lambda key: (route[key] - baseline[name][key]) / baseline[name][key] * 100
+                         if baseline[name][key] else 0.0, ('throughput', 'p50_ms', 'p95_ms', 'p99_ms'))
+            print(f'{"  vs baseline":<38}' + ''.join(f'{delta:>+9.1f}%' for delta in deltas))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8090)
+    parser.add_argument('--openai-port', type=int, default=8091)
+    parser.add_argument('--openai-latency', type=float, default=0.5)
+    parser.add_argument('--openai-tokens-per-second', type=float, default=50.0)
+    parser.add_argument('--openai-rate-limit-ratio', type=float, default=0.0)
+    parser.add_argument('--duration', type=float, default=30.0)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--workers', type=int, default=1, help='uvicorn worker processes of the app')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='comma separated "<route>=<weight>" pairs')
+    parser.add_argument('--output', help='write the report as JSON to this file')
+    parser.add_argument('--baseline', help='JSON report of a previous run to compare against')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    weights = parse_mix(args.mix)
+
+    processes = [start_fake_openai(args)]
+    try:
+        processes.append(start_app(args))
+        results, lock = {}, threading.Lock()
+        started = time.monotonic()
+        deadline = started + args.duration
+        with ThreadPoolExecutor(args.concurrency) as executor:
+            for _ in range(args.concurrency):
+                executor.submit(client_loop, args.host, args.port, weights, deadline, results, lock)
+        # requests in flight at the deadline still finish, so the run is longer than --duration
+        elapsed = time.monotonic() - started
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            process.wait()
+    report = summarize(results, elapsed)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,84 @@
+"""Seeds a benchmark workspace with generated interactions, matches and prompt blanks.
+
+Run from the repository root with the app environment (DB_* variables) set:
+    python bench/seed.py --interactions 100000
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+import uuid
+from zoneinfo import ZoneInfo
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+from sqlalchemy import insert, update
+
+from init import sqlalchemy_session
+from workspace.models import Workspace
+from gpt_interactions.models import GptInteraction, FilledPrompt
+from gpt_interactions.partitions import ensure_partitions, month_start
+from questions.models import Match
+from prompts.models import PromptBlank
+from prompts.texts import store_texts
+
+WORDS = ('market', 'product', 'launch', 'audience', 'budget', 'campaign', 'brand', 'growth', 'customer', 'channel',
+         'content', 'strategy', 'pricing', 'retention', 'funnel', 'segment', 'message', 'offer', 'trial', 'review')
+TEMPLATE_BLANKS = ('Write a short text for', 'The target audience is', 'Keep the tone', 'Mention the benefits of')
+
+
+def sentence(words: int) -> str:
+    return ' '.join(random.choices(WORDS, k=words))
+
+
+def seed_workspace(title: str, interactions: int, days: int, batch_size: int, matches: int):
+    workspace_id = uuid.uuid4()
+    now = datetime.datetime.now(ZoneInfo('Europe/Moscow'))
+    with sqlalchemy_session.begin() as session:
+        session.execute(update(Workspace).values(initial=False))
+        session.add(Workspace(id=workspace_id, title=title, initial=True))
+        session.add_all(Match(id=uuid.uuid4(), question=f'{{{word}_{i}}}', answer=sentence(3), color='#ffffff',
+                              workspace_id=workspace_id) for i, word in enumerate(random.choices(WORDS, k=matches)))
+        session.add_all(PromptBlank(id=uuid.uuid4(), text_data=blank, workspace_id=workspace_id)
+                        for blank in TEMPLATE_BLANKS)
+    month = month_start(now - datetime.timedelta(days=days))
+    ensure_partitions(month, (now.year - month.year) * 12 + now.month - month.month)
+
+    for offset in range(0, interactions, batch_size):
+        gpt_interactions, filled_prompts = [], []
+        for _ in range(min(batch_size, interactions - offset)):
+            interaction_id = uuid.uuid4()
+            time_happened = now - datetime.timedelta(seconds=random.uniform(0, days * 24 * 3600))
+            gpt_interactions.append({'id': interaction_id,
+                                     'username': random.choice(('alice', 'bob', 'carol')),
+                                     'company': 'bench',
+                                     'time_happened': time_happened,
+                                     'favorite': random.random() < 0.05,
+                                     'gpt_answer': sentence(random.randint(50, 300)),
+                                     'workspace_id': workspace_id})
+            filled_prompts.extend({'id': uuid.uuid4(),
+                                   'text_data': f'{blank} {sentence(5)}',
+                                   'gpt_interaction_id': interaction_id,
+                                   'number': number,
+                                   'time_happened': time_happened} for number, blank in enumerate(TEMPLATE_BLANKS))
+        with sqlalchemy_session.begin() as session:
+            hashes = store_texts(session, list(map(lambda f: f.pop('text_data'), filled_prompts)))
+            session.execute(insert(GptInteraction), gpt_interactions)
+            session.execute(insert(FilledPrompt), [{**f, 'text_hash': h} for f, h in zip(filled_prompts, hashes)])
+        print(f'{title}: {offset + len(gpt_interactions)}/{interactions} interactions', file=sys.stderr)
+    return workspace_id
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--interactions', type=int, default=1000, help='1k to 1M interactions per workspace')
+    parser.add_argument('--days', type=int, default=365, help='interactions are spread over this many past days')
+    parser.add_argument('--matches', type=int, default=50)
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--title', default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    random.seed(args.seed)
+    print(seed_workspace(args.title or f'bench-{args.interactions}-{uuid.uuid4().hex[:6]}',
+                         args.interactions, args.days, args.batch_size, args.matches))